@@ -0,0 +1,59 @@
+"""Run all benchmarks.
+
+Results can be saved as JSON to compare commits:
+`python -m benchmarks --json results.json`.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+from benchmarks import lcd_frame, pipeline, shairport_parse
+
+BENCHMARKS = {
+    "lcd_frame": lcd_frame.run,
+    "shairport_parse": shairport_parse.run,
+    "pipeline": pipeline.run,
+}
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except OSError, subprocess.CalledProcessError:
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--json", type=Path, help="save results to this file")
+    parser.add_argument("names", nargs="*", choices=[*BENCHMARKS])
+    args = parser.parse_args()
+    results: dict[str, dict[str, float]] = {}
+    for name in args.names or BENCHMARKS:
+        results[name] = BENCHMARKS[name]()
+        for metric, value in results[name].items():
+            print(f"{name + '.' + metric:<44}{value:>14.1f}")
+    if args.json:
+        args.json.write_text(
+            json.dumps(
+                {
+                    "commit": _commit(),
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                indent=2,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
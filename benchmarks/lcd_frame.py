@@ -0,0 +1,185 @@
+"""Per frame CPU time of the LCD driver on the gpiozero mock pin factory.
+
+Compare the former implementation (bits computed as strings for every character
+and every line rewritten) with compiled frames.
+Frames sent to a PCF8574 I2C backpack are measured on the fake bus, with the
+transactions and bytes they take.
+Sleeps are disabled so only the CPU time spent by the driver is measured.
+
+Run with `python -m benchmarks.lcd_frame`.
+"""
+
+import time
+from collections.abc import Callable, Sequence
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from gpiozero import Device, OutputDevice
+from gpiozero.pins.mock import MockFactory
+
+from qbee_gpio.display.i2c_bus import MockI2CBus
+from qbee_gpio.display.i2c_display import I2CLCDDisplay
+from qbee_gpio.display.lcd_config import I2CLCDConfig
+from qbee_gpio.display.lcd_display import (
+    GPIOLCDDisplay,
+    LCDConfig,
+    LCDPinConfig,
+)
+
+PINS = LCDPinConfig(
+    register_select=23, enable=24, data_4=9, data_5=25, data_6=17, data_7=10
+)
+FRAMES = 2000
+
+type Frame = Sequence[str]
+
+
+class LegacyPins:
+    def __init__(self, config: LCDPinConfig):
+        self.register_select = OutputDevice(config.register_select)
+        self.enable = OutputDevice(config.enable)
+        self.data = (
+            OutputDevice(config.data_4),
+            OutputDevice(config.data_5),
+            OutputDevice(config.data_6),
+            OutputDevice(config.data_7),
+        )
+
+    def close(self) -> None:
+        self.register_select.close()
+        self.enable.close()
+        for pin in self.data:
+            pin.close()
+
+
+class LegacyLCD:
+    """Former implementation of the frame writes, kept as reference."""
+
+    def __init__(self, pins: LegacyPins, width: int):
+        self._pins = pins
+        self._line_addresses = (0x00, 0x40, 0x00 + width, 0x40 + width)
+        self._last_cmd_start = 0.0
+        self._last_cmd_wait = 0.0
+
+    def print_lines(self, lines: Frame) -> None:
+        for i, line in enumerate(lines):
+            self._write(*self._get_bits(0x80 + self._line_addresses[i]))
+            for char in line:
+                self._write(*self._get_bits(ord(char)), is_cmd=False)
+
+    @staticmethod
+    def _get_bits(byte: int) -> tuple[tuple[int, ...], tuple[int, ...]]:
+        str_bits = tuple(map(int, bin(byte).removeprefix("0b").zfill(8)))
+        return str_bits[:4], str_bits[4:8]
+
+    def _write(
+        self,
+        high_bits: tuple[int, ...],
+        low_bits: tuple[int, ...] | None = None,
+        is_cmd: bool = True,
+    ) -> None:
+        self._pins.register_select.value = not is_cmd
+        self._send_half_byte(high_bits)
+        if (
+            wait := self._last_cmd_wait - (time.monotonic() - self._last_cmd_start)
+        ) > 0:
+            time.sleep(wait)
+            self._last_cmd_wait = 0
+        self._pulse_enable()
+        if low_bits:
+            self._send_half_byte(low_bits)
+            self._pulse_enable()
+        if is_cmd:
+            self._last_cmd_start = time.monotonic()
+            self._last_cmd_wait = 0.0001
+
+    def _send_half_byte(self, bits: tuple[int, ...]) -> None:
+        for pin, bit in zip(self._pins.data, reversed(bits), strict=True):
+            pin.value = bit
+
+    def _pulse_enable(self) -> None:
+        self._pins.enable.value = True
+        time.sleep(0.000001)
+        self._pins.enable.value = False
+
+
+def measure(print_lines: Callable[[Frame], None], frames: Sequence[Frame]) -> float:
+    """Return the CPU time per frame in µs."""
+    start = time.process_time_ns()
+    for i in range(FRAMES):
+        print_lines(frames[i % len(frames)])
+    return (time.process_time_ns() - start) / FRAMES / 1000
+
+
+def run() -> dict[str, float]:
+    """Return the CPU time per frame in µs, before and after, for each scenario.
+
+    Also the CPU time, I2C transactions and bytes per frame on the I2C backpack.
+    """
+    Device.pin_factory = MockFactory()
+    scenarios: dict[str, Sequence[Frame]] = {
+        # Every cell changes.
+        "full frame": (
+            ["Pink Floyd".center(16), "Money".center(16)],
+            ["Radiohead".center(16), "Airbag".center(16)],
+        ),
+        # Only the title changes.
+        "track change": (
+            ["Pink Floyd".center(16), "Money".center(16)],
+            ["Pink Floyd".center(16), "Time".center(16)],
+        ),
+    }
+    results: dict[str, float] = {}
+    with ExitStack() as stack:
+        stack.enter_context(patch("time.sleep"))
+        for name, frames in scenarios.items():
+            pins = LegacyPins(PINS)
+            before = measure(LegacyLCD(pins, 16).print_lines, frames)
+            pins.close()
+            lcd = GPIOLCDDisplay(LCDConfig(pins=PINS, spin_threshold=0))
+            lcd._init()
+            after = measure(lcd._print_lines, frames)
+            lcd._stop()
+            i2c_lcd = I2CLCDDisplay(I2CLCDConfig(spin_threshold=0, mock=True))
+            i2c_lcd._init()
+            bus = i2c_lcd._pins
+            assert isinstance(bus, MockI2CBus)
+            transactions, transferred = bus.transactions, bus.bytes
+            i2c = measure(i2c_lcd._print_lines, frames)
+            key = name.replace(" ", "_")
+            results[f"{key}_before_us"] = before
+            results[f"{key}_after_us"] = after
+            results[f"{key}_i2c_us"] = i2c
+            results[f"{key}_i2c_transactions"] = (
+                bus.transactions - transactions
+            ) / FRAMES
+            results[f"{key}_i2c_bytes"] = (bus.bytes - transferred) / FRAMES
+            i2c_lcd._stop()
+    return results
+
+
+def main() -> None:
+    results = run()
+    print(
+        f"{'scenario':<14}{'before (µs)':>14}{'after (µs)':>14}"
+        f"{'i2c (µs)':>14}{'transactions':>14}{'bytes':>14}"
+    )
+    for name in ("full frame", "track change"):
+        key = name.replace(" ", "_")
+        print(
+            f"{name:<14}"
+            + "".join(
+                f"{results[f'{key}_{metric}']:>14.1f}"
+                for metric in (
+                    "before_us",
+                    "after_us",
+                    "i2c_us",
+                    "i2c_transactions",
+                    "i2c_bytes",
+                )
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
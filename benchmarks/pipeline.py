@@ -0,0 +1,179 @@
+"""Event to pixel benchmark of the whole pipeline on the gpiozero mock pin factory.
+
+The real UDP server, orchestrator, power and LCD display are used,
+datagrams are sent over loopback UDP.
+
+Run with `python -m benchmarks.pipeline`.
+"""
+
+import asyncio
+import socket
+import statistics
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from gpiozero import Device
+from gpiozero.pins.mock import MockFactory, MockPin
+
+from benchmarks.shairport_parse import BURST
+from qbee_gpio.config import QbeeConfig
+from qbee_gpio.display import DisplayConfig
+from qbee_gpio.display.lcd_display import GPIOLCDDisplay, LCDConfig, LCDPinConfig
+from qbee_gpio.events import UDPServerConfig
+from qbee_gpio.events.server import EventsServer
+from qbee_gpio.orchestrator import QbeeOrchestrator
+from qbee_gpio.power import PowerConfig
+
+LCD_PINS = LCDPinConfig(
+    register_select=23, enable=24, data_4=9, data_5=25, data_6=17, data_7=10
+)
+PIN_ON = 27
+DATAGRAMS = 20000
+# Datagrams sent before waiting for them to be received, to not overflow the socket.
+BATCH = 64
+SAMPLES = 100
+TIMEOUT = 5
+
+
+class PinWrites:
+    """Record every mock pin change, from any thread."""
+
+    def __init__(self):
+        self.writes: list[tuple[float, str]] = []
+
+    @contextmanager
+    def record(self) -> Iterator[None]:
+        change_state = MockPin._change_state
+
+        def _change_state(pin: MockPin, value: bool) -> bool:
+            changed = change_state(pin, value)
+            if changed:
+                self.writes.append((time.perf_counter(), pin.info.name))
+            return changed
+
+        with patch.object(MockPin, "_change_state", _change_state):
+            yield
+
+    def since(self, start: float, pins: set[str]) -> list[float]:
+        return [t for t, pin in self.writes if t >= start and pin in pins]
+
+
+async def wait_for(condition: Callable[[], bool]) -> None:
+    deadline = time.perf_counter() + TIMEOUT
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError
+        await asyncio.sleep(0)
+
+
+def p95(values: list[float]) -> float:
+    return statistics.quantiles(values, n=20)[-1]
+
+
+async def measure() -> dict[str, float]:
+    config = QbeeConfig(
+        udp=UDPServerConfig(host="127.0.0.1", port=0),
+        power=PowerConfig(pin_on=PIN_ON, pin_standby=22, standby_duration=0),
+        display=DisplayConfig(lcd=LCDConfig(pins=LCD_PINS)),
+        stop_debounce=0,
+    )
+    pins = PinWrites()
+    received = 0
+    datagram_received = EventsServer.datagram_received
+
+    def _datagram_received(server, data, addr):
+        nonlocal received
+        datagram_received(server, data, addr)
+        received += 1
+
+    results: dict[str, float] = {}
+    with (
+        pins.record(),
+        patch.object(EventsServer, "datagram_received", _datagram_received),
+    ):
+        async with QbeeOrchestrator(config) as orchestrator:
+            await orchestrator._udp_events._connected.wait()
+            assert orchestrator._udp_events._transport
+            address = orchestrator._udp_events._transport.get_extra_info("sockname")
+            lcd = orchestrator._display
+            assert isinstance(lcd, GPIOLCDDisplay)
+            client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+            # Datagrams parsed per second.
+            start = time.perf_counter()
+            for i in range(0, DATAGRAMS, BATCH):
+                for j in range(i, i + BATCH):
+                    client.sendto(BURST[j % len(BURST)], address)
+                await wait_for(lambda i=i: received >= i + BATCH)
+            results["datagrams_per_s"] = received / (time.perf_counter() - start)
+            # The burst left the source playing, stop it and wait for the amp to turn off.
+            client.sendto(b"ssncpend", address)
+            assert orchestrator._power
+            on_switch = orchestrator._power._on_switch
+            await wait_for(lambda: not on_switch.value)
+
+            # Playing event to relay switched on.
+            relay = {f"GPIO{PIN_ON}"}
+            latencies = []
+            for _ in range(SAMPLES):
+                start = time.perf_counter()
+                client.sendto(b"librespot:playing", address)
+                await wait_for(lambda start=start: bool(pins.since(start, relay)))
+                latencies.append(pins.since(start, relay)[0] - start)
+                start = time.perf_counter()
+                client.sendto(b"librespot:stopped", address)
+                await wait_for(lambda start=start: bool(pins.since(start, relay)))
+            results["event_to_relay_median_us"] = statistics.median(latencies) * 1e6
+            results["event_to_relay_p95_us"] = p95(latencies) * 1e6
+
+            # Song event to first LCD pin write and frame rendered.
+            client.sendto(b"librespot:playing", address)
+            lcd_pins = {
+                f"GPIO{pin}"
+                for pin in LCD_PINS.model_dump().values()
+                if pin is not None
+            }
+            latencies, writes, durations = [], [], []
+            print_lines = lcd._print_lines
+
+            def _print_lines(lines):
+                start = time.perf_counter()
+                print_lines(lines)
+                durations.append(time.perf_counter() - start)
+
+            with patch.object(lcd, "_print_lines", _print_lines):
+                for i in range(SAMPLES):
+                    rendered = lcd.frame_stats.rendered
+                    start = time.perf_counter()
+                    client.sendto(
+                        f"librespot:artists:Pink Floyd,album:Meddle,title:Track {i}".encode(),
+                        address,
+                    )
+                    await wait_for(
+                        lambda rendered=rendered: lcd.frame_stats.rendered > rendered
+                    )
+                    frame_writes = pins.since(start, lcd_pins)
+                    latencies.append(frame_writes[0] - start)
+                    writes.append(len(frame_writes))
+            results["event_to_display_median_us"] = statistics.median(latencies) * 1e6
+            results["event_to_display_p95_us"] = p95(latencies) * 1e6
+            results["pin_writes_per_frame"] = statistics.mean(writes)
+            results["frame_wall_time_median_us"] = statistics.median(durations) * 1e6
+            client.close()
+    return results
+
+
+def run() -> dict[str, float]:
+    Device.pin_factory = MockFactory()
+    return asyncio.run(measure())
+
+
+def main() -> None:
+    for name, value in run().items():
+        print(f"{name:<28}{value:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
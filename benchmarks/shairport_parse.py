@@ -0,0 +1,90 @@
+"""Datagrams per second parsed from a shairport-sync metadata burst.
+
+Compare the former implementation (a chain of prefix checks and a global song)
+with the dispatch table.
+
+Run with `python -m benchmarks.shairport_parse`.
+"""
+
+import time
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from qbee_gpio.events.interface import Event, Playing, Song
+from qbee_gpio.events.shairport import ShairportParser
+
+ROUNDS = 2000
+
+# Metadata sent by shairport-sync on a track change, most codes are not used.
+BURST: Sequence[bytes] = (
+    b"ssncpbeg",
+    b"ssncmdst",
+    b"coremper\x00\x00\x00\x00\x12\x34\x56\x78",
+    b"coreasalThe Dark Side Of The Moon (2011 Remastered Version)",
+    b"coreasarPink Floyd",
+    b"coreascpRoger Waters",
+    b"coreasgnProgressive Rock",
+    b"coreminmMoney - 2011 Remastered Version",
+    b"coreastn\x00\x06",
+    b"coreastm\x00\x05\xf4\x38",
+    b"coreasdk\x00",
+    b"coreascmRemastered",
+    b"coreasai\x00\x00\x00\x00\x00\x00\x00\x01",
+    b"ssncmden",
+    b"ssncpcst",
+    b"ssncPICT" + bytes(2048),
+    b"ssncpcen",
+    b"ssncprgr1234/5678/9012",
+)
+
+
+class LegacyParser:
+    """Former implementation, kept as reference."""
+
+    def __init__(self):
+        self._song: dict[str, Any] = {}
+
+    def parse(self, data: bytes) -> Event | None:
+        if data == b"ssncpbeg":
+            return Event("shairport", Playing(True))
+        if data == b"ssncpend":
+            return Event("shairport", Playing(False))
+        if data.startswith(b"ssncmdst"):
+            self._song = {}
+        elif data.startswith(b"coreasar"):
+            self._song["artist"] = data.removeprefix(b"coreasar").decode("utf-8")
+        elif data.startswith(b"coreasal"):
+            self._song["album"] = data.removeprefix(b"coreasal").decode("utf-8")
+        elif data.startswith(b"coreminm"):
+            self._song["title"] = data.removeprefix(b"coreminm").decode("utf-8")
+        elif data.startswith(b"ssncmden"):
+            s = Song(**self._song)
+            self._song = {}
+            return Event("shairport", s)
+        return None
+
+
+def measure(parse: Callable[..., Event | None], *args: Any) -> float:
+    """Return the number of datagrams parsed per second."""
+    start = time.perf_counter_ns()
+    for _ in range(ROUNDS):
+        for data in BURST:
+            parse(data, *args)
+    return ROUNDS * len(BURST) / ((time.perf_counter_ns() - start) / 1e9)
+
+
+def run() -> dict[str, float]:
+    return {
+        "before_per_s": measure(LegacyParser().parse),
+        "after_per_s": measure(ShairportParser().parse, ("127.0.0.1", 5000)),
+    }
+
+
+def main() -> None:
+    results = run()
+    print(f"{'before (dgram/s)':>18}{'after (dgram/s)':>18}")
+    print(f"{results['before_per_s']:>18.0f}{results['after_per_s']:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,27 @@ import asyncio
 import logging.config
 import sys
 
-from concurrent_tasks import LoopExceptionHandler
-
 from qbee_gpio.config import QbeeConfig
-from qbee_gpio.orchestrator import QbeeOrchestrator
+from qbee_gpio.events import bind_udp_socket
 
 cfg = QbeeConfig.load()
-logging.config.dictConfig(cfg.logging)
-if "-v" in sys.argv:
-    logging.getLogger().setLevel(logging.DEBUG)
+# Bind before the slower start of devices to not lose events sent meanwhile,
+# GPIO libraries are only imported when creating them.
+udp_socket = bind_udp_socket(cfg.udp)
+
+from concurrent_tasks import LoopExceptionHandler  # noqa: E402
+
+from qbee_gpio.orchestrator import QbeeOrchestrator  # noqa: E402
+from qbee_gpio.reload import ConfigWatcher  # noqa: E402
+
+
+def configure_logging(config: QbeeConfig) -> None:
+    logging.config.dictConfig(config.logging)
+    if "-v" in sys.argv:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+
+configure_logging(cfg)
 
 logger = logging.getLogger("qbee_gpio")
 
@@ -25,9 +37,15 @@ async def stop() -> None:
 async def run() -> None:
     logger.debug("starting...")
     async with LoopExceptionHandler(stop_func=stop):
-        async with QbeeOrchestrator(cfg):
-            logger.info("started")
-            await stop_event.wait()
+        async with QbeeOrchestrator(cfg, udp_socket) as orchestrator:
+
+            async def reload(config: QbeeConfig) -> None:
+                configure_logging(config)
+                await orchestrator.reload(config)
+
+            async with ConfigWatcher(reload, cfg.reload_interval):
+                logger.info("started")
+                await stop_event.wait()
     logger.debug("stopped")
 
 
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Self
+
+from concurrent_tasks import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+type Command = Callable[[], Awaitable]
+
+
+class CommandStream:
+    """Run commands for a device in order, independently from other devices.
+
+    A command sent with a key replaces the pending one with the same key,
+    it then runs after the commands sent in the meantime.
+    Pending commands are run before exiting, up to the timeout.
+    """
+
+    def __init__(self, name: str, timeout: float | None = None):
+        self._name = name
+        self.timeout = timeout
+        self._queue: deque[tuple[Hashable | None, Command]] = deque()
+        self._pending = asyncio.Event()
+        self._done = asyncio.Event()
+        self._done.set()
+        # Commands replaced by a newer one before running.
+        self.replaced = 0
+        self._task = BackgroundTask(self._run)
+
+    async def __aenter__(self) -> Self:
+        self._task.create()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            await asyncio.wait_for(self._done.wait(), self.timeout)
+        except TimeoutError:
+            logger.warning("%s: timeout running pending commands", self._name)
+        self._task.cancel()
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def send(self, command: Command, key: Hashable | None = None) -> None:
+        if key is not None:
+            for i, (pending, _) in enumerate(self._queue):
+                if pending == key:
+                    del self._queue[i]
+                    self.replaced += 1
+                    break
+        self._queue.append((key, command))
+        self._pending.set()
+        self._done.clear()
+
+    async def _run(self) -> None:
+        while True:
+            await self._pending.wait()
+            _, command = self._queue.popleft()
+            if not self._queue:
+                self._pending.clear()
+            try:
+                await command()
+            except Exception:
+                logger.exception("%s: error running command", self._name)
+            finally:
+                if not self._queue:
+                    self._done.set()
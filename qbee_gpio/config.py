@@ -1,15 +1,39 @@
+from typing import Literal
+
 import zenconfig
 from pydantic import BaseModel, Field
 
 from qbee_gpio.display import DisplayConfig
-from qbee_gpio.events import UDPServerConfig
+from qbee_gpio.events import PipeConfig, Source, UDPServerConfig
+from qbee_gpio.metrics import MetricsConfig
 from qbee_gpio.power import PowerConfig
 
 
 class QbeeConfig(BaseModel, zenconfig.Config):
     udp: UDPServerConfig = UDPServerConfig()
+    # Read shairport-sync metadata from its pipe instead of UDP.
+    pipe: PipeConfig | None = None
+    # Number of seconds a stop must last before being processed,
+    # shorter ones happen during seeks, track transitions or buffer underruns.
+    stop_debounce: float = 0.5
+    # Sources by decreasing priority, used when several are playing.
+    priority: list[Source] = ["shairport", "librespot"]
+    # When a source starts playing while another one is playing:
+    # - always: it takes over the devices
+    # - priority: it takes over only if it has a higher priority
+    # - never: the other one keeps the devices until it stops
+    preemption: Literal["always", "priority", "never"] = "always"
     power: PowerConfig | None = None
     display: DisplayConfig = DisplayConfig()
+    # Serve metrics over HTTP on the loopback interface.
+    metrics: MetricsConfig | None = None
+    # Warm restart: on exit, leave the amp and display as they are and save the state
+    # to this file for the next start to take over without turning them off.
+    # Changing this requires a restart.
+    state_path: str | None = None
+    # Number of seconds between checks of the config file for changes, 0 to not reload.
+    # Changing this requires a restart.
+    reload_interval: float = 5
     logging: dict = Field(
         default_factory=lambda: {
             "version": 1,
@@ -1,13 +1,27 @@
 from pydantic import BaseModel
 
 from qbee_gpio.display.interface import Display
-from qbee_gpio.display.lcd_display import GPIOLCDDisplay, LCDConfig
+from qbee_gpio.display.lcd_config import HD44780Config, I2CLCDConfig, LCDConfig
+from qbee_gpio.metrics import Registry
 
 
 class DisplayConfig(BaseModel):
     lcd: LCDConfig | None = None
+    # LCD connected through a PCF8574 I2C backpack, instead of GPIO pins.
+    i2c_lcd: I2CLCDConfig | None = None
 
-    def get_display(self) -> Display | None:
+    @property
+    def controller(self) -> HD44780Config | None:
+        return self.lcd or self.i2c_lcd
+
+    def get_display(self, metrics: Registry | None = None) -> Display | None:
         if self.lcd:
-            return GPIOLCDDisplay(self.lcd)
+            # GPIO libraries are slow to import, only do it when needed.
+            from qbee_gpio.display.lcd_display import GPIOLCDDisplay
+
+            return GPIOLCDDisplay(self.lcd, metrics)
+        if self.i2c_lcd:
+            from qbee_gpio.display.i2c_display import I2CLCDDisplay
+
+            return I2CLCDDisplay(self.i2c_lcd, metrics)
         return None
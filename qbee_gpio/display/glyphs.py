@@ -0,0 +1,144 @@
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import NamedTuple
+
+# The controller has 8 custom characters, 4 with the 5x10 font.
+CGRAM_SLOTS = 8
+CGRAM_TALL_SLOTS = 4
+
+
+class Glyph(NamedTuple):
+    # Displayed when no custom character is available.
+    fallback: str
+    # 5x8 bitmap, one row per byte.
+    rows: tuple[int, int, int, int, int, int, int, int]
+
+
+# Characters missing from the controller ROM.
+GLYPHS: dict[str, Glyph] = {
+    "á": Glyph("a", (0x02, 0x04, 0x0E, 0x01, 0x0F, 0x11, 0x0F, 0x00)),
+    "à": Glyph("a", (0x08, 0x04, 0x0E, 0x01, 0x0F, 0x11, 0x0F, 0x00)),
+    "â": Glyph("a", (0x04, 0x0A, 0x0E, 0x01, 0x0F, 0x11, 0x0F, 0x00)),
+    "ä": Glyph("a", (0x00, 0x0A, 0x0E, 0x01, 0x0F, 0x11, 0x0F, 0x00)),
+    "ã": Glyph("a", (0x0D, 0x12, 0x0E, 0x01, 0x0F, 0x11, 0x0F, 0x00)),
+    "å": Glyph("a", (0x04, 0x0A, 0x04, 0x0E, 0x01, 0x0F, 0x11, 0x0F)),
+    "æ": Glyph("a", (0x00, 0x00, 0x1A, 0x05, 0x0F, 0x14, 0x0B, 0x00)),
+    "ç": Glyph("c", (0x00, 0x00, 0x0E, 0x10, 0x10, 0x11, 0x0E, 0x04)),
+    "é": Glyph("e", (0x02, 0x04, 0x0E, 0x11, 0x1F, 0x10, 0x0E, 0x00)),
+    "è": Glyph("e", (0x08, 0x04, 0x0E, 0x11, 0x1F, 0x10, 0x0E, 0x00)),
+    "ê": Glyph("e", (0x04, 0x0A, 0x0E, 0x11, 0x1F, 0x10, 0x0E, 0x00)),
+    "ë": Glyph("e", (0x00, 0x0A, 0x0E, 0x11, 0x1F, 0x10, 0x0E, 0x00)),
+    "í": Glyph("i", (0x02, 0x04, 0x0C, 0x04, 0x04, 0x04, 0x0E, 0x00)),
+    "ì": Glyph("i", (0x08, 0x04, 0x0C, 0x04, 0x04, 0x04, 0x0E, 0x00)),
+    "î": Glyph("i", (0x04, 0x0A, 0x0C, 0x04, 0x04, 0x04, 0x0E, 0x00)),
+    "ï": Glyph("i", (0x00, 0x0A, 0x0C, 0x04, 0x04, 0x04, 0x0E, 0x00)),
+    "ñ": Glyph("n", (0x0D, 0x12, 0x16, 0x19, 0x11, 0x11, 0x11, 0x00)),
+    "ó": Glyph("o", (0x02, 0x04, 0x0E, 0x11, 0x11, 0x11, 0x0E, 0x00)),
+    "ò": Glyph("o", (0x08, 0x04, 0x0E, 0x11, 0x11, 0x11, 0x0E, 0x00)),
+    "ô": Glyph("o", (0x04, 0x0A, 0x0E, 0x11, 0x11, 0x11, 0x0E, 0x00)),
+    "ö": Glyph("o", (0x00, 0x0A, 0x0E, 0x11, 0x11, 0x11, 0x0E, 0x00)),
+    "õ": Glyph("o", (0x0D, 0x12, 0x0E, 0x11, 0x11, 0x11, 0x0E, 0x00)),
+    "ø": Glyph("o", (0x00, 0x01, 0x0E, 0x13, 0x15, 0x19, 0x0E, 0x10)),
+    "œ": Glyph("o", (0x00, 0x00, 0x0A, 0x15, 0x17, 0x14, 0x0B, 0x00)),
+    "ß": Glyph("s", (0x0C, 0x12, 0x14, 0x16, 0x11, 0x11, 0x16, 0x10)),
+    "ú": Glyph("u", (0x02, 0x04, 0x11, 0x11, 0x11, 0x13, 0x0D, 0x00)),
+    "ù": Glyph("u", (0x08, 0x04, 0x11, 0x11, 0x11, 0x13, 0x0D, 0x00)),
+    "û": Glyph("u", (0x04, 0x0A, 0x11, 0x11, 0x11, 0x13, 0x0D, 0x00)),
+    "ü": Glyph("u", (0x00, 0x0A, 0x11, 0x11, 0x11, 0x13, 0x0D, 0x00)),
+    "À": Glyph("A", (0x08, 0x04, 0x0E, 0x11, 0x1F, 0x11, 0x11, 0x00)),
+    "Ä": Glyph("A", (0x0A, 0x0E, 0x11, 0x11, 0x1F, 0x11, 0x11, 0x00)),
+    "Å": Glyph("A", (0x04, 0x0A, 0x0E, 0x11, 0x1F, 0x11, 0x11, 0x00)),
+    "Ç": Glyph("C", (0x0E, 0x11, 0x10, 0x10, 0x11, 0x0E, 0x04, 0x08)),
+    "É": Glyph("E", (0x02, 0x04, 0x1F, 0x10, 0x1E, 0x10, 0x1F, 0x00)),
+    "È": Glyph("E", (0x08, 0x04, 0x1F, 0x10, 0x1E, 0x10, 0x1F, 0x00)),
+    "Ñ": Glyph("N", (0x0D, 0x00, 0x11, 0x19, 0x15, 0x13, 0x11, 0x00)),
+    "Ö": Glyph("O", (0x0A, 0x0E, 0x11, 0x11, 0x11, 0x11, 0x0E, 0x00)),
+    "Ø": Glyph("O", (0x0E, 0x13, 0x15, 0x15, 0x15, 0x19, 0x0E, 0x00)),
+    "Ü": Glyph("U", (0x0A, 0x00, 0x11, 0x11, 0x11, 0x11, 0x0E, 0x00)),
+}
+
+
+@dataclass
+class GlyphStats:
+    # Characters already in a slot.
+    hits: int = 0
+    # Characters written to a slot.
+    uploads: int = 0
+
+
+class GlyphCache:
+    """Map characters missing from the controller ROM to the custom character slots.
+
+    Glyphs shared between consecutive frames are kept,
+    the least recently used glyph is replaced when a new one is needed.
+    With the 5x10 font, the lowest bit of character codes is ignored.
+    """
+
+    def __init__(self, tall: bool = False):
+        self._slots: OrderedDict[str, int] = OrderedDict()
+        self._size = CGRAM_TALL_SLOTS if tall else CGRAM_SLOTS
+        self._code_shift = 1 if tall else 0
+        self.stats = GlyphStats()
+
+    def reset(self) -> None:
+        self._slots.clear()
+
+    def encode(
+        self,
+        lines: Sequence[str],
+    ) -> tuple[list[bytes], list[tuple[int, Glyph]]]:
+        """Encode lines for the controller.
+
+        :return: the encoded lines and the glyphs to upload to their slots.
+        """
+        needed = dict.fromkeys(
+            char for line in lines for char in line if char in GLYPHS
+        )
+        for char in needed:
+            if char in self._slots:
+                self._slots.move_to_end(char)
+                self.stats.hits += 1
+        uploads: list[tuple[int, Glyph]] = []
+        for char in needed:
+            if char in self._slots:
+                continue
+            if len(self._slots) < self._size:
+                slot = len(self._slots)
+            elif stale := next((c for c in self._slots if c not in needed), None):
+                slot = self._slots.pop(stale)
+            else:
+                # All slots are used by this frame.
+                continue
+            self._slots[char] = slot
+            uploads.append((slot, GLYPHS[char]))
+            self.stats.uploads += 1
+        return [self._encode(line) for line in lines], uploads
+
+    def _encode(self, line: str) -> bytes:
+        return b"".join(
+            bytes((self._slots[char] << self._code_shift,))
+            if char in self._slots
+            else GLYPHS[char].fallback.encode()
+            if char in GLYPHS
+            else char.encode("ascii", "replace")
+            for char in line
+        )
+
+
+def normalize(text: str) -> str:
+    """Keep characters that can be displayed, remove accents from others."""
+    return "".join(
+        char if char.isascii() or char in GLYPHS else remove_accents(char)
+        for char in unicodedata.normalize("NFC", text)
+    )
+
+
+def remove_accents(text: str) -> str:
+    """Remove accents from text."""
+    return (
+        unicodedata.normalize("NFKD", text)
+        .encode("ASCII", "ignore")
+        .decode("utf-8", "ignore")
+    )
@@ -0,0 +1,54 @@
+import fcntl
+import os
+
+# ioctl setting the address of the device to talk to, from linux/i2c-dev.h.
+I2C_SLAVE = 0x0703
+# Largest write the kernel accepts in a single transaction.
+MAX_TRANSFER_SIZE = 8192
+
+
+class I2CBus:
+    """Write bytes to a device on a Linux I2C bus.
+
+    Each write is sent as a single transaction, the device receives the bytes
+    one after the other, without any register address.
+    """
+
+    def __init__(self, bus: int, address: int):
+        self._fd = os.open(f"/dev/i2c-{bus}", os.O_RDWR)
+        try:
+            fcntl.ioctl(self._fd, I2C_SLAVE, address)
+        except OSError:
+            os.close(self._fd)
+            raise
+        self.transactions = 0
+        self.bytes = 0
+
+    def write(self, data: bytes | bytearray) -> None:
+        for start in range(0, len(data), MAX_TRANSFER_SIZE):
+            block = data[start : start + MAX_TRANSFER_SIZE]
+            self._write(block)
+            self.transactions += 1
+            self.bytes += len(block)
+
+    def _write(self, block: bytes | bytearray) -> None:
+        os.write(self._fd, block)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class MockI2CBus(I2CBus):
+    """Fake bus counting transactions and bytes, to run without the hardware."""
+
+    def __init__(self, bus: int, address: int):
+        self.transactions = 0
+        self.bytes = 0
+        # Last byte written, an expander keeps its outputs in this state.
+        self.state: int | None = None
+
+    def _write(self, block: bytes | bytearray) -> None:
+        self.state = block[-1]
+
+    def close(self) -> None:
+        pass
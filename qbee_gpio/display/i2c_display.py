@@ -0,0 +1,100 @@
+import math
+from collections.abc import Iterable
+
+from qbee_gpio.display.i2c_bus import I2CBus, MockI2CBus
+from qbee_gpio.display.lcd_config import I2CLCDConfig
+from qbee_gpio.display.lcd_display import HD44780Display, PinStates, Write
+from qbee_gpio.metrics import Registry
+
+# PCF8574 outputs wired to the LCD on common backpacks, data pins 4 to 7 are
+# on the high half. Read/write (0x02) is kept low, the busy flag is not read.
+REGISTER_SELECT = 0x01
+ENABLE = 0x04
+BACKLIGHT = 0x08
+# Bits on the bus for each byte, including the acknowledgement.
+BYTE_BITS = 9
+# Longer waits end the block to sleep, shorter ones are filled with bytes.
+MAX_PADDED_WAIT = 0.001
+
+
+def expander_byte(register_select: bool, half_byte: PinStates) -> int:
+    return sum(state << (4 + i) for i, state in enumerate(half_byte)) | (
+        REGISTER_SELECT if register_select else 0
+    )
+
+
+class I2CLCDDisplay(HD44780Display[I2CBus]):
+    """HD44780 LCD connected through a PCF8574 I2C backpack.
+
+    Each write is sent as expander bytes: register select and the high half are
+    set, then enable is pulsed for each half.
+    Writes are gathered in blocks sent as a single transaction, the time taken
+    by the following bytes on the bus gives the controller time to process them.
+    """
+
+    def __init__(self, config: I2CLCDConfig, metrics: Registry | None = None):
+        super().__init__(config, metrics)
+        self._bus_number = config.bus
+        self._address = config.address
+        self._bus_type = MockI2CBus if config.mock else I2CBus
+        self._backlight = BACKLIGHT if config.backlight else 0
+        self._byte_duration = BYTE_BITS / config.frequency
+        # Writes are compiled from a few hundred distinct ones.
+        self._encoded: dict[Write, bytes] = {}
+        # Transactions and bytes of closed buses.
+        self._transactions = 0
+        self._bytes = 0
+        metrics = metrics or Registry()
+        metrics.callback(
+            "lcd_i2c_transactions_total",
+            "I2C transactions to the LCD.",
+            lambda: self._transactions + (self._pins.transactions if self._pins else 0),
+            kind="counter",
+        )
+        metrics.callback(
+            "lcd_i2c_bytes_total",
+            "Bytes written to the LCD over I2C.",
+            lambda: self._bytes + (self._pins.bytes if self._pins else 0),
+            kind="counter",
+        )
+
+    def _open(self) -> I2CBus:
+        return self._bus_type(self._bus_number, self._address)
+
+    def _close(self, pins: I2CBus) -> None:
+        # Turn off the backlight.
+        pins.write(b"\x00")
+        self._leave(pins)
+
+    def _leave(self, pins: I2CBus) -> None:
+        # The expander keeps its outputs once the bus is closed.
+        self._transactions += pins.transactions
+        self._bytes += pins.bytes
+        pins.close()
+
+    def _run(self, plan: Iterable[Write]) -> None:
+        """Send compiled writes in as few transactions as possible."""
+        assert self._pins
+        block = bytearray()
+        for write in plan:
+            if (encoded := self._encoded.get(write)) is None:
+                encoded = self._encoded[write] = self._encode(write)
+            block += encoded
+            if write.wait > MAX_PADDED_WAIT:
+                self._pins.write(block)
+                block.clear()
+                self._delay(write.wait)
+        if block:
+            self._pins.write(block)
+
+    def _encode(self, write: Write) -> bytes:
+        high = expander_byte(write.register_select, write.high) | self._backlight
+        data = [high, high | ENABLE, high]
+        if write.low:
+            low = expander_byte(write.register_select, write.low) | self._backlight
+            data += [low | ENABLE, low]
+        if write.wait <= MAX_PADDED_WAIT:
+            # The next write sets up pins before pulsing enable, 2 bytes later.
+            padding = math.ceil(write.wait / self._byte_duration) - 2
+            data += [data[-1]] * max(padding, 0)
+        return bytes(data)
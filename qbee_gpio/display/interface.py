@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 
+from qbee_gpio.display.lcd_config import HD44780Config
 from qbee_gpio.events import Song
+from qbee_gpio.state import LCDState
 
 
 class Display(ABC):
@@ -8,6 +10,28 @@ class Display(ABC):
     async def init(self) -> None: ...
     @abstractmethod
     async def stop(self) -> None: ...
+    @abstractmethod
+    async def idle(self) -> None:
+        """Turn off the display but keep it ready to resume with `init`."""
+
+    @abstractmethod
+    async def adopt(self, state: LCDState) -> None:
+        """Initialize from the state left by a previous process, without clearing."""
+
+    @abstractmethod
+    async def detach(self) -> LCDState | None:
+        """Stop without clearing nor closing pins, for the next process to adopt."""
+
     @abstractmethod
     async def display_now_playing(self, song: Song) -> None:
-        """:raises RuntimeError if display is not initialized."""
+        """Queue the song before suspending, newer ones replace it until drawn.
+
+        :raises RuntimeError if display is not initialized.
+        """
+
+    @abstractmethod
+    async def reconfigure(self, config: HD44780Config) -> bool:
+        """Apply a new config in place, what is displayed is kept.
+
+        Return whether it could be applied, the display needs to be replaced otherwise.
+        """
@@ -0,0 +1,145 @@
+from collections.abc import Sequence
+
+from gpiozero import Device, OutputDevice
+from gpiozero.pins.mock import MockFactory
+
+from qbee_gpio.display.lcd_display import PinStates
+from qbee_gpio.state import release_driven
+
+
+class LCDBus:
+    """Register select and data pins, written together.
+
+    This falls back to writing each pin that changed one by one.
+    """
+
+    def __init__(self, register_select: int, data: Sequence[int]):
+        self._devices = tuple(OutputDevice(pin) for pin in (register_select, *data))
+        self._states: tuple[bool, ...] = tuple(False for _ in self._devices)
+        # Writes that changed at least a pin.
+        self.writes = 0
+
+    def write(self, register_select: bool, data: PinStates) -> None:
+        states = (register_select, *data)
+        if states != self._states:
+            self._write(states)
+            self._states = states
+            self.writes += 1
+
+    def _write(self, states: tuple[bool, ...]) -> None:
+        for device, state, previous in zip(
+            self._devices, states, self._states, strict=True
+        ):
+            if state != previous:
+                device.value = state
+
+    def set_reading(self, reading: bool) -> None:
+        """Switch data pins to inputs to read from the controller.
+        Register select is kept low while reading.
+        """
+        if reading:
+            self.write(False, self._data_states())
+            for device in self._devices[1:]:
+                device.pin.function = "input"
+        else:
+            for device, state in zip(self._devices[1:], self._states[1:], strict=True):
+                device.pin.output_with_state(state)
+
+    def read(self) -> PinStates:
+        pins = [device.pin for device in self._devices[1:]]
+        return (
+            bool(pins[0].state),
+            bool(pins[1].state),
+            bool(pins[2].state),
+            bool(pins[3].state),
+        )
+
+    def _data_states(self) -> PinStates:
+        return (self._states[1], self._states[2], self._states[3], self._states[4])
+
+    def close(self) -> None:
+        for device in self._devices:
+            device.close()
+
+    def leave(self) -> None:
+        """Release pins leaving them as they are."""
+        for device in self._devices:
+            release_driven(device)
+
+
+class LGPIOBus(LCDBus):
+    """Write all pins in a single call using an lgpio group."""
+
+    def __init__(self, handle: int, register_select: int, data: Sequence[int]):
+        # Keep the devices to have pins reserved in gpiozero.
+        super().__init__(register_select, data)
+        import lgpio  # ty: ignore[unresolved-import]
+
+        self._lgpio = lgpio
+        self._handle = handle
+        self._gpios = (register_select, *data)
+        # Pins have been claimed individually by gpiozero, they need to be freed first.
+        for gpio in self._gpios:
+            lgpio.gpio_free(self._handle, gpio)
+        lgpio.group_claim_output(self._handle, list(self._gpios))
+
+    def _write(self, states: tuple[bool, ...]) -> None:
+        self._lgpio.group_write(
+            self._handle,
+            self._gpios[0],
+            sum(state << i for i, state in enumerate(states)),
+        )
+
+    def set_reading(self, reading: bool) -> None:
+        if reading:
+            self._lgpio.group_free(self._handle, self._gpios[0])
+            self._lgpio.gpio_claim_output(self._handle, self._gpios[0], 0)
+            for gpio in self._gpios[1:]:
+                self._lgpio.gpio_claim_input(self._handle, gpio)
+            self._states = (False, *self._data_states())
+        else:
+            for gpio in self._gpios:
+                self._lgpio.gpio_free(self._handle, gpio)
+            self._lgpio.group_claim_output(
+                self._handle, list(self._gpios), [int(s) for s in self._states]
+            )
+
+    def read(self) -> PinStates:
+        values = [self._lgpio.gpio_read(self._handle, gpio) for gpio in self._gpios[1:]]
+        return (bool(values[0]), bool(values[1]), bool(values[2]), bool(values[3]))
+
+    def close(self) -> None:
+        self._lgpio.group_free(self._handle, self._gpios[0])
+        super().close()
+
+
+class MockBus(LCDBus):
+    """Bus used with the mock pin factory, counting transactions."""
+
+    def __init__(self, register_select: int, data: Sequence[int]):
+        super().__init__(register_select, data)
+        self.transactions = 0
+        self.reads = 0
+
+    def _write(self, states: tuple[bool, ...]) -> None:
+        self.transactions += 1
+        super()._write(states)
+
+    def read(self) -> PinStates:
+        self.reads += 1
+        return super().read()
+
+
+def get_bus(register_select: int, data: Sequence[int]) -> LCDBus:
+    """Get the most efficient bus the pin factory supports."""
+    Device.ensure_pin_factory()
+    factory = Device.pin_factory
+    if isinstance(factory, MockFactory):
+        return MockBus(register_select, data)
+    try:
+        from gpiozero.pins.lgpio import LGPIOFactory
+    except ImportError:
+        return LCDBus(register_select, data)
+    if isinstance(factory, LGPIOFactory):
+        return LGPIOBus(factory._handle, register_select, data)
+    return LCDBus(register_select, data)
@@ -0,0 +1,59 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class LCDPinConfig(BaseModel):
+    """GPIO PIN configuration (BCM mode)."""
+
+    register_select: int
+    enable: int
+    data_4: int
+    data_5: int
+    data_6: int
+    data_7: int
+    # Optional, to read the busy flag instead of waiting for the maximum duration.
+    # Do not connect unless the LCD runs on 3.3V or data pins go through a level shifter.
+    read_write: int | None = None
+
+
+class HD44780Config(BaseModel):
+    """Options common to all ways of connecting the LCD controller."""
+
+    width: int = 16
+    lines: Literal[1, 2, 4] = 2
+    line_height: Literal[8, 10] = 8
+    # Delays shorter than this are busy-waited instead of sleeping, 0 to always sleep.
+    # Sleeping is not precise under 1ms and will make updates slower.
+    spin_threshold: float = 0.001
+    # Maximum number of frames per second, 0 for no limit.
+    # Frames received in the meantime are dropped and only the latest is displayed.
+    max_frame_rate: float = 0
+    # Scroll lines longer than the width instead of truncating them.
+    # When they fit in the controller memory, the whole display is shifted,
+    # including shorter lines.
+    marquee: bool = False
+    # Number of seconds between each scroll step.
+    scroll_interval: float = 0.4
+    # Display accented characters using custom characters instead of removing accents.
+    custom_characters: bool = True
+    # Number of seconds to keep the LCD initialized but turned off after playing stops.
+    idle_duration: float = 600
+
+
+class LCDConfig(HD44780Config):
+    pins: LCDPinConfig
+
+
+class I2CLCDConfig(HD44780Config):
+    """LCD connected through a PCF8574 I2C backpack."""
+
+    # I2C bus number, as in /dev/i2c-1.
+    bus: int = 1
+    # Address of the backpack, usually 0x27 or 0x3f.
+    address: int = 0x27
+    # Bus frequency in Hz as configured for the system, to space writes enough.
+    frequency: int = 100_000
+    backlight: bool = True
+    # Write to a fake bus instead of the device, to run without the hardware.
+    mock: bool = False
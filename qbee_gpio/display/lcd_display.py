@@ -1,155 +1,404 @@
 import asyncio
-import unicodedata
-from collections.abc import Callable, Sequence
-from functools import partial
-from time import monotonic, sleep
-from typing import Literal, cast
+import contextlib
+import logging
+from abc import abstractmethod
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from time import monotonic, perf_counter
+from typing import TYPE_CHECKING, NamedTuple
 
-from gpiozero import OutputDevice
-from pydantic import BaseModel
+from concurrent_tasks import BackgroundTask
 
+from qbee_gpio.display.glyphs import GlyphCache, GlyphStats, normalize, remove_accents
 from qbee_gpio.display.interface import Display
+from qbee_gpio.display.lcd_config import HD44780Config, LCDConfig, LCDPinConfig
+from qbee_gpio.display.timing import DelayStats, get_delay
+from qbee_gpio.display.worker import (
+    Adopt,
+    Command,
+    Detach,
+    DisplayWorker,
+    Frame,
+    FrameStats,
+    Idle,
+    Init,
+    Resize,
+    Scroll,
+    Stop,
+)
 from qbee_gpio.events import Song
+from qbee_gpio.metrics import Registry
+from qbee_gpio.state import LCDState, release_driven
 
-type Bit = Literal[0, 1]
-type HalfByte = tuple[Bit, Bit, Bit, Bit]
+if TYPE_CHECKING:
+    from qbee_gpio.display.lcd_bus import LCDBus
 
+logger = logging.getLogger(__name__)
 
-class LCDPinConfig(BaseModel):
-    """GPIO PIN configuration (BCM mode)."""
+# DDRAM addresses go up to 0x67 (40 characters on each of the 2 internal lines).
+DDRAM_SIZE = 0x68
+DDRAM_LINE = 40
+# Spaces between the end and the start of scrolling text.
+MARQUEE_GAP = 4
 
-    register_select: int
-    enable: int
-    data_4: int
-    data_5: int
-    data_6: int
-    data_7: int
+# States of data pins 4 to 7.
+type PinStates = tuple[bool, bool, bool, bool]
 
 
-class LCDConfig(BaseModel):
-    pins: LCDPinConfig
-    width: int = 16
-    lines: Literal[1, 2, 4] = 2
-    line_height: Literal[8, 10] = 8
+class Write(NamedTuple):
+    """A single write to the controller, ready to be sent to the pins."""
+
+    register_select: bool
+    high: PinStates
+    # `None` to only send the high half, used when initializing in 8-bit mode.
+    low: PinStates | None
+    # Time the controller needs to process the write before the next one.
+    wait: float
+
+
+type Plan = Sequence[Write]
+
+
+def _pin_states(half_byte: int) -> PinStates:
+    return (
+        bool(half_byte & 0b0001),
+        bool(half_byte & 0b0010),
+        bool(half_byte & 0b0100),
+        bool(half_byte & 0b1000),
+    )
+
+
+# Pin states for the high and low half of every byte.
+NIBBLES: tuple[tuple[PinStates, PinStates], ...] = tuple(
+    (_pin_states(byte >> 4), _pin_states(byte & 0x0F)) for byte in range(256)
+)
+# Maximum time for a data write to be processed (37µs + 4µs).
+DATA_WAIT = 0.00005
+# Data writes are always the same, compile them once.
+DATA_WRITES: tuple[Write, ...] = tuple(
+    Write(True, high, low, DATA_WAIT) for high, low in NIBBLES
+)
+
+
+def command(byte: int, wait: float = 0.0001) -> Write:
+    """Command write, wait for more than 37µs unless otherwise specified."""
+    high, low = NIBBLES[byte]
+    return Write(False, high, low, wait)
+
+
+# Wait for more than 1.52ms.
+CLEAR = command(0x01, wait=0.002)
+# Reset the display shift, wait for more than 1.52ms.
+RETURN_HOME = command(0x02, wait=0.002)
+# Shift the whole display one character to the left.
+SHIFT_LEFT = command(0x18)
+# Display on/off control: cursor off, cursor blink off.
+DISPLAY_ON = command(0x0C)
+DISPLAY_OFF = command(0x08)
+# No need to wait here as if the PI is booted power is already high enough.
+# Send 3 times the same command to ensure 8-bit mode, then switch to 4-bit.
+HANDSHAKE: Plan = (
+    # Wait more than 4.1ms here as per specs.
+    Write(False, NIBBLES[0x30][0], None, 0.005),
+    # Wait more than 100µs here as per specs.
+    Write(False, NIBBLES[0x30][0], None, 0.00011),
+    Write(False, NIBBLES[0x30][0], None, 0.0001),
+    Write(False, NIBBLES[0x20][0], None, 0.0001),
+)
 
 
 class LCDPins:
     def __init__(self, config: LCDPinConfig):
-        self.register_select = OutputDevice(config.register_select)
+        from gpiozero import OutputDevice
+
+        from qbee_gpio.display.lcd_bus import get_bus
+
         self.enable = OutputDevice(config.enable)
-        self.data = (
-            OutputDevice(config.data_4),
-            OutputDevice(config.data_5),
-            OutputDevice(config.data_6),
-            OutputDevice(config.data_7),
+        self.read_write = (
+            OutputDevice(config.read_write) if config.read_write is not None else None
+        )
+        self.bus: "LCDBus" = get_bus(  # noqa: UP037
+            config.register_select,
+            (config.data_4, config.data_5, config.data_6, config.data_7),
         )
 
     def close(self) -> None:
-        self.register_select.close()
         self.enable.close()
-        for pin in self.data:
-            pin.close()
-
-
-class GPIOLCDDisplay(Display):
+        if self.read_write:
+            self.read_write.close()
+        self.bus.close()
+
+    def leave(self) -> None:
+        """Release pins leaving them as they are."""
+        release_driven(self.enable)
+        if self.read_write:
+            release_driven(self.read_write)
+        self.bus.leave()
+
+
+# Config fields applied without initializing the LCD again.
+RECONFIGURABLE = {
+    "width",
+    "max_frame_rate",
+    "marquee",
+    "scroll_interval",
+    "custom_characters",
+    "idle_duration",
+}
+
+
+class HD44780Display[P](Display):
     """Hitachi HD44780 LCD controller.
     High level function to display text on the LCD.
 
+    Frames are compiled to writes, subclasses send them to the controller
+    through `P`, the pins or bus it is connected to.
+
     For more information see:
     - Condensed version: https://en.wikipedia.org/wiki/Hitachi_HD44780_LCD_controller
     - Datasheet: https://cdn-shop.adafruit.com/datasheets/HD44780.pdf
     """
 
-    def __init__(self, config: LCDConfig):
+    def __init__(self, config: HD44780Config, metrics: Registry | None = None):
+        self._config = config
         self._width = config.width
         self._lines = config.lines
-        self._line_height = config.line_height
         self._line_addresses = (0x00, 0x40, 0x00 + self._width, 0x40 + self._width)
-        self._pin_cfg = config.pins
-        self._pins: LCDPins | None = None
-
-        self._lock = asyncio.Lock()
-        self._last_cmd_start = 0.0
-        self._last_cmd_wait = 0.0
+        self._marquee = config.marquee
+        self._normalize = normalize if config.custom_characters else remove_accents
+        # Last message displayed and its alignment, laid out again on reconfigure.
+        self._message: tuple[str, Callable[[str, int], str]] | None = None
+        self._tall = config.line_height == 10
+        self._glyphs = GlyphCache(self._tall)
+        self._pins: P | None = None
+        # Shadow copy of the DDRAM to only write cells that changed.
+        self._ddram = bytearray(b" " * DDRAM_SIZE)
+        self._init_plan: Plan = (
+            *HANDSHAKE,
+            # Function set.
+            command(
+                0x20
+                | (0x08 if config.lines > 1 else 0)
+                | (0x04 if config.line_height != 8 else 0)
+            ),
+            DISPLAY_ON,
+            # Entry mode set: cursor moves right, display does not shift.
+            command(0x06),
+            CLEAR,
+        )
 
-    async def _exec[**P, R](
-        self,
-        func: Callable[P, R],
-        *args: P.args,
-        **kwargs: P.kwargs,
-    ) -> R:
-        async with self._lock:
-            return await asyncio.get_running_loop().run_in_executor(
-                None, partial(func, *args, **kwargs)
-            )
+        self._delay = get_delay(config.spin_threshold)
+        self._calibrated = False
 
-    async def init(self) -> None:
-        await self._exec(self._init)
+        self._worker = DisplayWorker(
+            self._handle, name="lcd", max_frame_rate=config.max_frame_rate
+        )
+        # Number of characters the display is shifted by the controller.
+        self._shift: int | None = None
+        # Lines scrolled by rewriting them, when too long for the controller memory.
+        self._scrolled_lines: Sequence[str] | None = None
+        self._scroll_step = 0
+        self._scroll_task = BackgroundTask(
+            self._scroll_periodically, config.scroll_interval
+        )
+        self._idle = False
+        self._idle_task = BackgroundTask(self._stop_when_idle, config.idle_duration)
 
-    def _init(self) -> None:
-        if self._pins:
-            return
-        self._pins = LCDPins(self._pin_cfg)
-        # No need to wait here as if the PI is booted power is already high enough.
-        # Send 3 times the same command to ensure 8-bit mode.
-        self._write(
-            (0, 0, 1, 1),
-            # Wait more than 4.1ms here as per specs.
-            wait_for=0.005,
+        metrics = metrics or Registry()
+        self._frame_duration = metrics.histogram(
+            "lcd_frame_write_seconds", "Time to write a frame to the LCD."
         )
-        self._write(
-            (0, 0, 1, 1),
-            # Wait more than 100µs here as per specs.
-            wait_for=0.00011,
+        metrics.callback(
+            "lcd_frames_rendered_total",
+            "Frames written to the LCD.",
+            lambda: self.frame_stats.rendered,
+            kind="counter",
         )
-        self._write((0, 0, 1, 1))
-        # Now switch to 4-bit.
-        self._write((0, 0, 1, 0))
-        # Function set.
-        self._write(
-            (0, 0, 1, 0),
-            (
-                1 if self._lines > 1 else 0,
-                1 if self._line_height != 8 else 0,
-                0,
-                0,
-            ),
+        metrics.callback(
+            "lcd_frames_dropped_total",
+            "Frames replaced by a newer one before being written.",
+            lambda: self.frame_stats.dropped,
+            kind="counter",
         )
-        # Display on/off control.
-        self._write(
-            (0, 0, 0, 0),
-            (
-                1,
-                1,  # Screen on.
-                0,  # Cursor off.
-                0,  # Cursor blink off.
-            ),
+        metrics.callback(
+            "lcd_glyph_uploads_total",
+            "Custom characters written to the LCD.",
+            lambda: self.glyph_stats.uploads,
+            kind="counter",
         )
-        # Entry mode set.
-        self._write(
-            (0, 0, 0, 0),
-            (
-                0,
-                1,
-                1,  # Cursor moves right.
-                0,  # Display does not shift.
-            ),
+        metrics.callback(
+            "lcd_delay_max_overshoot_seconds",
+            "Longest time a delay took more than requested.",
+            lambda: self.delay_stats.max_overshoot,
         )
-        self._clear()
+
+    def _handle(self, command: Command) -> None:
+        match command:
+            case Init():
+                self._init()
+            case Stop():
+                self._stop()
+            case Idle():
+                self._turn_off()
+            case Frame(lines):
+                start = perf_counter()
+                self._print_lines(lines)
+                self._frame_duration.observe(perf_counter() - start)
+            case Scroll():
+                self._scroll()
+            case Resize(width):
+                self._resize(width)
+            case Adopt(state):
+                self._adopt(state)
+            case Detach():
+                self._detach()
+
+    async def init(self) -> None:
+        self._idle_task.cancel()
+        await self._worker.run(Init())
+
+    def _init(self) -> None:
+        if self._pins:
+            if self._idle:
+                # Resume from idle, DDRAM content is kept.
+                self._run((DISPLAY_ON,))
+                self._idle = False
+            return
+        if not self._calibrated:
+            self._delay.calibrate()
+            self._calibrated = True
+        self._pins = self._open()
+        self._run(self._init_plan)
+        self._reset_ddram()
+        self._glyphs.reset()
+        self._idle = False
+
+    async def adopt(self, state: LCDState) -> None:
+        await self._worker.run(Adopt(state))
+        if state.idle:
+            self._idle_task.create()
+
+    def _adopt(self, state: LCDState) -> None:
+        try:
+            ddram = bytes.fromhex(state.ddram)
+        except ValueError:
+            ddram = b""
+        if len(ddram) != DDRAM_SIZE:
+            logger.warning("invalid LCD state, initializing")
+            self._init()
+            return
+        if not self._calibrated:
+            self._delay.calibrate()
+            self._calibrated = True
+        self._pins = self._open()
+        self._reset_ddram()
+        self._ddram[:] = ddram
+        # Custom characters are uploaded again when used.
+        self._glyphs.reset()
+        self._idle = state.idle
+
+    async def detach(self) -> LCDState | None:
+        self._idle_task.cancel()
+        self._scroll_task.cancel()
+        self._message = None
+        if not self._pins:
+            return None
+        await self._worker.run(Detach())
+        return LCDState(idle=self._idle, ddram=self._ddram.hex())
+
+    def _detach(self) -> None:
+        if not self._pins:
+            return
+        if self._shift:
+            self._run((RETURN_HOME,))
+            self._shift = None
+        self._leave(self._pins)
+        self._pins = None
 
     async def stop(self):
-        await self._exec(self._stop)
+        self._idle_task.cancel()
+        self._scroll_task.cancel()
+        self._message = None
+        await self._worker.run(Stop())
 
     def _stop(self) -> None:
         if not self._pins:
             return
-        self._clear()
-        self._pins.close()
+        self._run((CLEAR,))
+        self._reset_ddram()
+        self._close(self._pins)
         self._pins = None
+        self._idle = False
+        logger.debug(
+            "%d delays, mean overshoot %.1fµs, max %.1fµs",
+            self.delay_stats.count,
+            self.delay_stats.mean_overshoot * 1e6,
+            self.delay_stats.max_overshoot * 1e6,
+        )
 
-    def _clear(self) -> None:
-        # Wait for more than 1.52ms.
-        self._write((0, 0, 0, 0), (0, 0, 0, 1), wait_for=0.002)
+    async def idle(self) -> None:
+        self._scroll_task.cancel()
+        await self._worker.run(Idle())
+        self._idle_task.create()
+
+    def _turn_off(self) -> None:
+        if not self._pins or self._idle:
+            return
+        self._run((DISPLAY_OFF,))
+        self._idle = True
+
+    async def _stop_when_idle(self, duration: float) -> None:
+        if duration > 0:
+            await asyncio.sleep(duration)
+        logger.debug("stopping idle LCD")
+        self._scroll_task.cancel()
+        await self._worker.run(Stop())
+
+    async def reconfigure(self, config: HD44780Config) -> bool:
+        if type(config) is not type(self._config) or config.model_dump(
+            exclude=RECONFIGURABLE
+        ) != self._config.model_dump(exclude=RECONFIGURABLE):
+            return False
+        self._config = config
+        self._marquee = config.marquee
+        self._normalize = normalize if config.custom_characters else remove_accents
+        self._worker.max_frame_rate = config.max_frame_rate
+        self._scroll_task.cancel()
+        self._scroll_task = BackgroundTask(
+            self._scroll_periodically, config.scroll_interval
+        )
+        # Restart the idle timer with the new duration.
+        self._idle_task.cancel()
+        self._idle_task = BackgroundTask(self._stop_when_idle, config.idle_duration)
+        if self._idle:
+            self._idle_task.create()
+        await self._worker.run(Resize(config.width))
+        if self._message:
+            message, align = self._message
+            with contextlib.suppress(RuntimeError):
+                await self._display(message, align=align)
+        return True
+
+    def _resize(self, width: int) -> None:
+        self._width = width
+        self._line_addresses = (0x00, 0x40, 0x00 + width, 0x40 + width)
+
+    @property
+    def delay_stats(self) -> DelayStats:
+        return self._delay.stats
+
+    @property
+    def frame_stats(self) -> FrameStats:
+        return self._worker.stats
+
+    @property
+    def glyph_stats(self) -> GlyphStats:
+        return self._glyphs.stats
+
+    def _reset_ddram(self) -> None:
+        # Clearing fills the DDRAM with spaces and resets the shift.
+        self._ddram[:] = b" " * DDRAM_SIZE
+        self._shift = None
+        self._scrolled_lines = None
 
     async def display_now_playing(self, song: Song) -> None:
         match self._lines:
@@ -170,76 +419,239 @@ class GPIOLCDDisplay(Display):
         align: Callable[[str, int], str] = str.center,
     ) -> None:
         """Display a message on the screen."""
+        self._message = (message, align)
         # Only keep lines we can display.
         lines = message.split("\n")[: self._lines]
         # Add empty lines if needed.
         if len(lines) != self._lines:
             lines += [""] * (self._lines - len(lines))
-        # Trim to width, remove accents and align each line.
-        lines = [
-            align(remove_accents(line[: self._width]), self._width) for line in lines
-        ]
-        await self._exec(self._print_lines, lines)
+        # Remove accents, trim to width unless scrolling and align each line.
+        lines = [self._fit(self._normalize(line), align) for line in lines]
+        if not self._idle and any(len(line) > self._width for line in lines):
+            # Restart scrolling from the start, not while the screen is off.
+            self._scroll_task.create()
+        else:
+            self._scroll_task.cancel()
+        await self._worker.run(Frame(lines))
+
+    def _fit(self, line: str, align: Callable[[str, int], str]) -> str:
+        if self._marquee and len(line) > self._width:
+            return line
+        return align(line[: self._width], self._width)
+
+    async def _scroll_periodically(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self._worker.run(Scroll())
 
     def _print_lines(self, lines: Sequence[str]) -> None:
         if not self._pins:
             raise RuntimeError("LCD is not initialized")
-        for i, line in enumerate(lines):
-            self._write(
-                *get_bits(0x80 + self._line_addresses[i]),
+        plan: list[Write] = []
+        if self._shift:
+            plan.append(RETURN_HOME)
+        self._shift = None
+        self._scrolled_lines = None
+        self._scroll_step = 0
+        if all(len(line) <= self._width for line in lines):
+            frame = lines
+        elif self._lines == 2 and all(
+            len(line) + MARQUEE_GAP <= DDRAM_LINE for line in lines
+        ):
+            # Write the full lines and let the controller shift them. A single
+            # line display has one 80 characters line, the shift would not wrap
+            # at the end of our 40 characters.
+            frame = [line.ljust(DDRAM_LINE) for line in lines]
+            self._shift = 0
+        else:
+            self._scrolled_lines = lines
+            frame = [scroll_window(line, self._width, 0) for line in lines]
+        plan.extend(self._compile_frame(frame))
+        self._run(plan)
+
+    def _scroll(self) -> None:
+        if not self._pins:
+            return
+        if self._shift is not None:
+            # A single command per step.
+            self._run((SHIFT_LEFT,))
+            self._shift = (self._shift + 1) % DDRAM_LINE
+        elif self._scrolled_lines:
+            self._scroll_step += 1
+            self._run(
+                self._compile_frame(
+                    [
+                        scroll_window(line, self._width, self._scroll_step)
+                        for line in self._scrolled_lines
+                    ]
+                )
             )
-            for char in line:
-                self._write(*get_bits(ord(char)), is_cmd=False)
 
-    def _write(
-        self,
-        high_bits: HalfByte,
-        low_bits: HalfByte | None = None,
-        is_cmd: bool = True,
-        wait_for: float | None = None,
-    ) -> None:
+    def _compile_frame(self, lines: Sequence[str]) -> Plan:
+        """Compile the writes needed to go from the current DDRAM to the lines."""
+        plan: list[Write] = []
+        encoded, uploads = self._glyphs.encode(lines)
+        for slot, glyph in uploads:
+            if self._tall:
+                # Set CGRAM address, 16 bytes per slot, rows under the glyph blank.
+                plan.append(command(0x40 | slot << 4))
+                plan.extend(DATA_WRITES[row] for row in (*glyph.rows, 0, 0, 0))
+            else:
+                # Set CGRAM address.
+                plan.append(command(0x40 | slot << 3))
+                plan.extend(DATA_WRITES[row] for row in glyph.rows)
+        for i, new in enumerate(encoded):
+            address = self._line_addresses[i]
+            old = self._ddram[address : address + len(new)]
+            for offset, data in diff_runs(old, new):
+                # Set DDRAM address.
+                plan.append(command(0x80 | (address + offset)))
+                plan.extend(DATA_WRITES[byte] for byte in data)
+                self._ddram[address + offset : address + offset + len(data)] = data
+        return plan
+
+    @abstractmethod
+    def _open(self) -> P:
+        """Connect to the controller, it is initialized afterwards if needed."""
+
+    @abstractmethod
+    def _close(self, pins: P) -> None:
+        """Release the connection, the controller has been cleared."""
+
+    @abstractmethod
+    def _leave(self, pins: P) -> None:
+        """Drop the connection leaving the controller as it is, for the next process."""
+
+    @abstractmethod
+    def _run(self, plan: Iterable[Write]) -> None:
+        """Send compiled writes to the controller."""
+
+
+class GPIOLCDDisplay(HD44780Display[LCDPins]):
+    """HD44780 LCD connected to GPIO pins in 4-bit mode."""
+
+    def __init__(self, config: LCDConfig, metrics: Registry | None = None):
+        super().__init__(config, metrics)
+        self._pin_cfg = config.pins
+        self._last_cmd_start = 0.0
+        self._last_cmd_wait = 0.0
+        # Whether the last write can be waited on by reading the busy flag.
+        self._check_busy = False
+        # GPIO writes of closed pins and of the enable pin.
+        self._gpio_writes = 0
+        (metrics or Registry()).callback(
+            "lcd_gpio_writes_total",
+            "GPIO writes to the LCD.",
+            lambda: self._gpio_writes + (self._pins.bus.writes if self._pins else 0),
+            kind="counter",
+        )
+
+    def _open(self) -> LCDPins:
+        self._check_busy = False
+        return LCDPins(self._pin_cfg)
+
+    def _close(self, pins: LCDPins) -> None:
+        self._gpio_writes += pins.bus.writes
+        pins.close()
+
+    def _leave(self, pins: LCDPins) -> None:
+        self._gpio_writes += pins.bus.writes
+        pins.leave()
+
+    def _run(self, plan: Iterable[Write]) -> None:
+        """Replay compiled writes on the pins."""
         assert self._pins
-        self._pins.register_select.value = not is_cmd
-        self._send_half_byte(high_bits)
-        # Wait until enough time has passed for the previous command to be taken into account.
-        if (wait := self._last_cmd_wait - (monotonic() - self._last_cmd_start)) > 0:
-            sleep(wait)
-            self._last_cmd_wait = 0
-        self._pulse_enable()
-        if low_bits:
-            self._send_half_byte(low_bits)
+        bus = self._pins.bus
+        read_write = self._pins.read_write is not None
+        for write in plan:
+            if self._check_busy:
+                if monotonic() - self._last_cmd_start < self._last_cmd_wait:
+                    self._wait_ready()
+                else:
+                    # Polling costs more than it saves once the maximum has passed.
+                    self._check_busy = False
+            bus.write(write.register_select, write.high)
+            # Wait until enough time has passed for the previous command to be taken into account.
+            if (wait := self._last_cmd_wait - (monotonic() - self._last_cmd_start)) > 0:
+                self._delay(wait)
+                self._last_cmd_wait = 0
             self._pulse_enable()
-        if is_cmd:
+            if write.low:
+                bus.write(write.register_select, write.low)
+                self._pulse_enable()
+            # The busy flag cannot be read until the controller is in 4-bit mode.
+            self._check_busy = read_write and write.low is not None
             # Mark the start of the command.
             self._last_cmd_start = monotonic()
-            # Wait for more than 37µs unless otherwise specified.
-            self._last_cmd_wait = wait_for or 0.0001
+            self._last_cmd_wait = write.wait
+
+    def _wait_ready(self) -> None:
+        """Read the busy flag until the controller is ready.
+        Give up after the maximum duration of the last write.
+        """
+        assert self._pins
+        assert self._pins.read_write
+        self._pins.bus.set_reading(True)
+        self._pins.read_write.value = True
+        try:
+            while True:
+                busy, _ = self._read_status()
+                if not busy or monotonic() - self._last_cmd_start > self._last_cmd_wait:
+                    break
+        finally:
+            self._pins.read_write.value = False
+            self._pins.bus.set_reading(False)
+        self._check_busy = False
+        self._last_cmd_wait = 0
+
+    def _read_status(self) -> tuple[bool, int]:
+        """Read the busy flag and the address counter, high half first."""
+        assert self._pins
+        high = self._read_half_byte()
+        low = self._read_half_byte()
+        address = sum(state << i for i, state in enumerate((*low, *high[:3])))
+        return high[3], address
 
-    def _send_half_byte(self, bits: HalfByte) -> None:
+    def _read_half_byte(self) -> PinStates:
         assert self._pins
-        for pin, bit in zip(self._pins.data, reversed(bits), strict=True):
-            pin.value = bit
+        self._pins.enable.value = True
+        # Wait more than 360ns for data to be available.
+        self._delay(0.000001)
+        states = self._pins.bus.read()
+        self._pins.enable.value = False
+        self._gpio_writes += 2
+        return states
 
     def _pulse_enable(self) -> None:
         assert self._pins
         self._pins.enable.value = True
         # Wait more than 450ns.
-        sleep(0.000001)
+        self._delay(0.000001)
         self._pins.enable.value = False
-
-
-def get_bits(byte: int) -> tuple[HalfByte, HalfByte]:
-    str_bits = tuple(map(int, bin(byte).removeprefix("0b").zfill(8)))
-    return cast(HalfByte, str_bits[:4]), cast(HalfByte, str_bits[4:8])
-
-
-def remove_accents(text: str) -> str:
-    """Remove accents from text."""
-    return (
-        unicodedata.normalize("NFKD", text)
-        .encode("ASCII", "ignore")
-        .decode("utf-8", "ignore")
-    )
+        self._gpio_writes += 2
+
+
+def diff_runs(old: bytes | bytearray, new: bytes) -> Iterator[tuple[int, bytes]]:
+    """Yield the offset and content of each run of bytes that differ."""
+    start: int | None = None
+    for i, (a, b) in enumerate(zip(old, new, strict=True)):
+        if a != b:
+            if start is None:
+                start = i
+        elif start is not None:
+            yield start, new[start:i]
+            start = None
+    if start is not None:
+        yield start, new[start:]
+
+
+def scroll_window(line: str, width: int, step: int) -> str:
+    """Visible part of a line scrolled to the left, wrapping around."""
+    if len(line) <= width:
+        return line
+    text = line + " " * MARQUEE_GAP
+    start = step % len(text)
+    return (text + text)[start : start + width]
 
 
 async def debug():
@@ -0,0 +1,78 @@
+import logging
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DelayStats:
+    """Measured versus requested delays, in seconds."""
+
+    count: int = 0
+    requested: float = 0
+    measured: float = 0
+    max_overshoot: float = 0
+
+    def record(self, requested: float, measured: float) -> None:
+        self.count += 1
+        self.requested += requested
+        self.measured += measured
+        self.max_overshoot = max(self.max_overshoot, measured - requested)
+
+    @property
+    def mean_overshoot(self) -> float:
+        return (self.measured - self.requested) / self.count if self.count else 0
+
+
+class Delay:
+    """Wait using `time.sleep`.
+    On Linux short sleeps take much longer than requested because of scheduler granularity.
+    """
+
+    def __init__(self):
+        self.stats = DelayStats()
+
+    def __call__(self, seconds: float) -> None:
+        start = time.perf_counter_ns()
+        self._wait(start, int(seconds * 1e9))
+        self.stats.record(seconds, (time.perf_counter_ns() - start) / 1e9)
+
+    def _wait(self, start: int, duration: int) -> None:
+        time.sleep(duration / 1e9)
+
+    def calibrate(self) -> None: ...
+
+
+class SpinDelay(Delay):
+    """Spin on the performance counter for delays shorter than the threshold.
+    Longer delays sleep then spin for the remaining time, the sleep overshoot is calibrated.
+    """
+
+    def __init__(self, threshold: float):
+        super().__init__()
+        self._threshold = int(threshold * 1e9)
+        self._overshoot = self._threshold
+
+    def _wait(self, start: int, duration: int) -> None:
+        deadline = start + duration
+        if duration > self._threshold and duration > self._overshoot:
+            time.sleep((duration - self._overshoot) / 1e9)
+        while time.perf_counter_ns() < deadline:
+            pass
+
+    def calibrate(self, samples: int = 50, probe: float = 0.0001) -> None:
+        """Measure how late sleeps wake up."""
+        overshoots = []
+        for _ in range(samples):
+            start = time.perf_counter_ns()
+            time.sleep(probe)
+            overshoots.append(time.perf_counter_ns() - start - int(probe * 1e9))
+        overshoots.sort()
+        # Use a high percentile to rarely wake up late.
+        self._overshoot = overshoots[int(samples * 0.9)]
+        logger.debug("sleep overshoot: %.1fµs", self._overshoot / 1000)
+
+
+def get_delay(spin_threshold: float) -> Delay:
+    return SpinDelay(spin_threshold) if spin_threshold > 0 else Delay()
@@ -0,0 +1,159 @@
+import asyncio
+import contextlib
+import threading
+from collections import deque
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from time import monotonic
+
+from qbee_gpio.state import LCDState
+
+
+@dataclass(frozen=True)
+class Init: ...
+
+
+@dataclass(frozen=True)
+class Stop: ...
+
+
+@dataclass(frozen=True)
+class Idle: ...
+
+
+@dataclass(frozen=True)
+class Frame:
+    lines: Sequence[str]
+
+
+@dataclass(frozen=True)
+class Scroll: ...
+
+
+@dataclass(frozen=True)
+class Resize:
+    width: int
+
+
+@dataclass(frozen=True)
+class Adopt:
+    """Take over a display initialized by a previous process."""
+
+    state: LCDState
+
+
+@dataclass(frozen=True)
+class Detach:
+    """Stop without closing pins nor clearing, for the next process to adopt it."""
+
+
+type Command = Init | Stop | Idle | Frame | Scroll | Resize | Adopt | Detach
+
+
+@dataclass
+class FrameStats:
+    rendered: int = 0
+    # Frames replaced by a newer one before being rendered.
+    dropped: int = 0
+
+
+class DisplayWorker:
+    """Run display commands in order in a dedicated thread that owns the pins.
+
+    The thread is started with the first command and exits once stopped
+    with nothing left to process.
+    Frames waiting to be rendered are replaced by newer ones so only the latest is drawn.
+    """
+
+    def __init__(
+        self,
+        handle: Callable[[Command], None],
+        name: str = "display",
+        max_frame_rate: float = 0,
+    ):
+        self._handle = handle
+        self._name = name
+        self.max_frame_rate = max_frame_rate
+        self._next_frame = 0.0
+        self._queue: deque[tuple[Command, asyncio.Future[None]]] = deque()
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self.stats = FrameStats()
+
+    @property
+    def max_frame_rate(self) -> float:
+        return 1 / self._frame_interval if self._frame_interval else 0
+
+    @max_frame_rate.setter
+    def max_frame_rate(self, value: float) -> None:
+        self._frame_interval = 1 / value if value > 0 else 0
+
+    async def run(self, command: Command) -> None:
+        future = asyncio.get_running_loop().create_future()
+        with self._condition:
+            if (
+                isinstance(command, Frame)
+                and self._queue
+                and isinstance(self._queue[-1][0], Frame)
+            ):
+                # Latest wins, the previous frame was not rendered yet.
+                _resolve(self._queue[-1][1], None)
+                self._queue[-1] = (command, future)
+                self.stats.dropped += 1
+            else:
+                self._queue.append((command, future))
+            self._condition.notify()
+            if not self._thread:
+                self._thread = threading.Thread(
+                    target=self._work, name=self._name, daemon=True
+                )
+                self._thread.start()
+        await future
+
+    def _next(self) -> tuple[Command, asyncio.Future[None]]:
+        with self._condition:
+            while True:
+                if not self._queue:
+                    self._condition.wait()
+                elif (
+                    isinstance(self._queue[0][0], Frame)
+                    and (wait := self._next_frame - monotonic()) > 0
+                ):
+                    # Newer frames can replace this one while waiting.
+                    self._condition.wait(wait)
+                else:
+                    return self._queue.popleft()
+
+    def _work(self) -> None:
+        while True:
+            command, future = self._next()
+            try:
+                self._handle(command)
+            except Exception as e:
+                _resolve(future, e)
+            else:
+                _resolve(future, None)
+            if isinstance(command, Frame):
+                self.stats.rendered += 1
+                self._next_frame = monotonic() + self._frame_interval
+            elif isinstance(command, Stop | Detach):
+                with self._condition:
+                    if not self._queue:
+                        self._thread = None
+                        return
+
+
+def _resolve(future: asyncio.Future[None], exc: Exception | None) -> None:
+    """Complete the future from the worker thread without blocking."""
+
+    def _set() -> None:
+        if future.done():
+            return
+        if exc:
+            future.set_exception(exc)
+        else:
+            future.set_result(None)
+
+    # The loop might be closed already if nothing is waiting anymore.
+    with contextlib.suppress(RuntimeError):
+        future.get_loop().call_soon_threadsafe(_set)
@@ -1,2 +1,5 @@
-from qbee_gpio.events.interface import Event, Playing, Song, Source
-from qbee_gpio.events.server import EventsServer, UDPServerConfig
+from qbee_gpio.events.debounce import DebounceStats, PlayingDebouncer
+from qbee_gpio.events.interface import Event, Playing, SessionStart, Song, Source
+from qbee_gpio.events.pipe import MetadataPipe, PipeConfig
+from qbee_gpio.events.queue import EventQueue, QueueStats
+from qbee_gpio.events.server import EventsServer, UDPServerConfig, bind_udp_socket
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Self
+
+from qbee_gpio.events.interface import Event, Playing, Source
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DebounceStats:
+    # Stops followed by a start before the delay, never forwarded.
+    absorbed: int = 0
+
+
+class PlayingDebouncer:
+    """Hold stop events for a delay and drop them if playback starts again meanwhile.
+
+    Players briefly stop during seeks, track transitions or buffer underruns.
+    Start events and other events are forwarded immediately.
+    """
+
+    def __init__(self, forward: Callable[[Event], None], delay: float):
+        self._forward = forward
+        self.delay = delay
+        self._stops: dict[Source, tuple[Event, asyncio.TimerHandle]] = {}
+        self.stats = DebounceStats()
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        # Nothing should be lost on exit.
+        for event, handle in list(self._stops.values()):
+            handle.cancel()
+            self._forward_stop(event)
+
+    def put(self, event: Event) -> None:
+        if self.delay <= 0 or not isinstance(event.data, Playing):
+            self._forward(event)
+        elif not event.data:
+            if event.source not in self._stops:
+                # Forward the original event to keep when it was received.
+                self._stops[event.source] = (
+                    event,
+                    asyncio.get_running_loop().call_later(
+                        self.delay, self._forward_stop, event
+                    ),
+                )
+        else:
+            if stop := self._stops.pop(event.source, None):
+                stop[1].cancel()
+                self.stats.absorbed += 1
+                logger.debug("absorbed stop from %s", event.source)
+            self._forward(event)
+
+    def _forward_stop(self, event: Event) -> None:
+        del self._stops[event.source]
+        self._forward(event)
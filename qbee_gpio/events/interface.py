@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from time import perf_counter
 from typing import Literal
 
 
@@ -12,10 +13,17 @@ class Song:
 class Playing(int): ...
 
 
+@dataclass(frozen=True)
+class SessionStart:
+    """Playback is about to start."""
+
+
 type Source = Literal["librespot", "shairport"]
 
 
 @dataclass(frozen=True)
 class Event:
     source: Source
-    data: Song | Playing
+    data: Song | Playing | SessionStart
+    # When the event was received, to measure latencies.
+    received: float = field(default_factory=perf_counter, compare=False)
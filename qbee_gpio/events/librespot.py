@@ -1,17 +1,19 @@
 import re
 
-from qbee_gpio.events.interface import Event, Playing, Song
+from qbee_gpio.events.interface import Event, Playing, SessionStart, Song
 
 _RE_SONG = re.compile(
     r"artists:(?P<artists>.*?),album:(?P<album>.*?),title:(?P<title>.*)"
 )
 
 
-def parse(data: bytes) -> Event | None:
+def parse(data: bytes, session: bytes = b"session") -> Event | None:
     if data == b"playing":
         return Event("librespot", Playing(True))
     elif data == b"stopped":
         return Event("librespot", Playing(False))
+    elif data == session:
+        return Event("librespot", SessionStart())
     elif (match := _RE_SONG.search(data.decode("utf-8"))) and (
         metadata := match.groupdict()
     ):
@@ -0,0 +1,127 @@
+import asyncio
+import base64
+import logging
+import os
+import re
+from collections.abc import Callable, Iterator
+from functools import partial
+
+from concurrent_tasks import RobustStream
+from pydantic import BaseModel
+
+from qbee_gpio.events.interface import Event
+from qbee_gpio.events.shairport import ShairportParser
+
+logger = logging.getLogger(__name__)
+
+_ITEM_END = b"</item>"
+_RE_HEADER = re.compile(
+    rb"<type>\s*([0-9a-fA-F]{8})\s*</type>\s*<code>\s*([0-9a-fA-F]{8})\s*</code>"
+)
+_RE_DATA = re.compile(rb'<data encoding="base64">\s*(.*?)\s*</data>', re.DOTALL)
+
+
+class PipeConfig(BaseModel):
+    # Shairport-sync metadata pipe, `pipe_name` in its config.
+    path: str = "/tmp/shairport-sync-metadata"
+    # Items larger than this are skipped, cover art for instance.
+    max_item_size: int = 16384
+    # Seconds to wait before opening the pipe again if it failed.
+    retry_interval: float = 5
+    timeout: float = 5
+
+
+class ItemParser:
+    """Incrementally split the metadata XML into items.
+
+    At most one item is buffered, larger items are skipped.
+    """
+
+    def __init__(self, max_item_size: int):
+        self._max_item_size = max_item_size
+        self._buffer = bytearray()
+        self._skipping = False
+
+    def feed(self, data: bytes) -> Iterator[tuple[bytes, bytes]]:
+        """Yield the type and code header and the encoded data of complete items."""
+        self._buffer += data
+        while (end := self._buffer.find(_ITEM_END)) >= 0:
+            item = bytes(self._buffer[:end])
+            del self._buffer[: end + len(_ITEM_END)]
+            if self._skipping:
+                self._skipping = False
+            elif parsed := parse_item(item):
+                yield parsed
+        if len(self._buffer) > self._max_item_size:
+            # Keep enough to find the end of the item.
+            del self._buffer[: -len(_ITEM_END)]
+            if not self._skipping:
+                logger.debug("skipping item larger than %d bytes", self._max_item_size)
+            self._skipping = True
+
+
+def parse_item(item: bytes) -> tuple[bytes, bytes] | None:
+    if not (header := _RE_HEADER.search(item)):
+        return None
+    data = _RE_DATA.search(item, header.end())
+    return (
+        bytes.fromhex(header[1].decode()) + bytes.fromhex(header[2].decode()),
+        data[1] if data else b"",
+    )
+
+
+class MetadataPipe(RobustStream):
+    """Receive shairport-sync events from its metadata pipe.
+
+    Unlike UDP, nothing is lost when metadata comes in bursts.
+    """
+
+    def __init__(
+        self,
+        config: PipeConfig,
+        process: Callable[[Event], None],
+    ):
+        super().__init__(
+            connector=partial(self._open, config.path),
+            name="shairport-pipe",
+            backoff=self._backoff,
+            timeout=config.timeout,
+        )
+        self._retry_interval = config.retry_interval
+        self._retrying = False
+        self._path = config.path
+        self._items = ItemParser(config.max_item_size)
+        self._shairport = ShairportParser()
+
+        self._process = process
+
+    @staticmethod
+    async def _open(path: str, protocol_factory: Callable[[], asyncio.Protocol]):
+        # Opening for writing too keeps the pipe open when shairport-sync restarts.
+        fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+        try:
+            return await asyncio.get_running_loop().connect_read_pipe(
+                protocol_factory, os.fdopen(fd, "rb", buffering=0)
+            )
+        except Exception:
+            os.close(fd)
+            raise
+
+    async def _backoff(self) -> None:
+        if self._retrying:
+            await asyncio.sleep(self._retry_interval)
+        self._retrying = True
+
+    def connection_made(self, transport) -> None:
+        self._retrying = False
+        super().connection_made(transport)
+
+    def data_received(self, data: bytes) -> None:
+        for header, encoded in self._items.feed(data):
+            # Only decode data for codes in use.
+            if self._shairport.handles(header):
+                event = self._shairport.parse(
+                    header + base64.b64decode(encoded), self._path
+                )
+                if event:
+                    self._process(event)
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Self
+
+from concurrent_tasks import BackgroundTask
+
+from qbee_gpio.events.interface import Event, Playing, SessionStart, Song, Source
+
+logger = logging.getLogger(__name__)
+
+# Pending transitions per source, collapsing keeps at most 2 playing events
+# so only session starts can reach it.
+MAX_TRANSITIONS = 8
+
+
+@dataclass
+class QueueStats:
+    # Songs replaced by a newer one before being processed.
+    songs_dropped: int = 0
+    # Playing or session start events merged with pending ones: repeated session starts,
+    # playing events equal to the pending state or cancelling a pending change.
+    playing_collapsed: int = 0
+    # Session starts dropped because too many transitions are pending.
+    transitions_dropped: int = 0
+    # Events that took longer than the timeout to process.
+    timeouts: int = 0
+    max_depth: int = 0
+
+
+@dataclass
+class _SourceQueue:
+    # Playing or session start events.
+    transitions: deque[Event] = field(default_factory=deque)
+    song: Event | None = None
+    # Last playing state taken by the consumer.
+    playing: Playing | None = None
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+    # Set once everything has been processed.
+    drained: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def depth(self) -> int:
+        return len(self.transitions) + (self.song is not None)
+
+
+class EventQueue:
+    """Queue events per source until processed, a source never waits for another.
+
+    Playing transitions and session starts are processed before the pending song,
+    only the latest song is kept.
+    Playing transitions are never dropped but a change undone before being processed
+    is skipped. Repeated session starts are collapsed, transitions are bounded.
+    Pending events are processed before exiting, up to the timeout.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[Event], Awaitable],
+        timeout: float | None = None,
+    ):
+        self._process = process
+        self.timeout = timeout
+        self._queues: dict[Source, _SourceQueue] = {}
+        self._consumers: dict[Source, BackgroundTask] = {}
+        self._running = False
+        self.stats = QueueStats()
+
+    async def __aenter__(self) -> Self:
+        self._running = True
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._running = False
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    *(queue.drained.wait() for queue in self._queues.values())
+                ),
+                self.timeout,
+            )
+        except TimeoutError:
+            logger.warning("timeout processing pending events")
+        for consumer in self._consumers.values():
+            consumer.cancel()
+        self._consumers.clear()
+        self._queues.clear()
+
+    @property
+    def depth(self) -> int:
+        return sum(queue.depth for queue in self._queues.values())
+
+    def put(self, event: Event) -> None:
+        if not self._running:
+            raise RuntimeError(f"{self.__class__.__name__} is not running")
+        if (queue := self._queues.get(event.source)) is None:
+            queue = self._queues[event.source] = _SourceQueue()
+            consumer = self._consumers[event.source] = BackgroundTask(
+                self._consume, queue
+            )
+            consumer.create()
+        match event.data:
+            case Playing():
+                if not self._put_playing(queue, event):
+                    return
+            case SessionStart():
+                if not self._put_session_start(queue, event):
+                    return
+            case Song():
+                if queue.song is not None:
+                    self.stats.songs_dropped += 1
+                queue.song = event
+        self.stats.max_depth = max(self.stats.max_depth, self.depth)
+        queue.drained.clear()
+        queue.ready.set()
+
+    def _put_playing(self, queue: _SourceQueue, event: Event) -> bool:
+        """Return whether the event was queued."""
+        pending = [
+            i for i, e in enumerate(queue.transitions) if isinstance(e.data, Playing)
+        ]
+        states = [queue.playing, *(queue.transitions[i].data for i in pending)]
+        if states[-1] == event.data:
+            self.stats.playing_collapsed += 1
+            return False
+        if pending and states[-2] == event.data:
+            # Undone before being processed.
+            del queue.transitions[pending[-1]]
+            self.stats.playing_collapsed += 1
+            return False
+        queue.transitions.append(event)
+        return True
+
+    def _put_session_start(self, queue: _SourceQueue, event: Event) -> bool:
+        """Return whether the event was queued."""
+        for pending in reversed(queue.transitions):
+            if isinstance(pending.data, SessionStart):
+                # Already pending since the last playing event.
+                self.stats.playing_collapsed += 1
+                return False
+            if isinstance(pending.data, Playing):
+                break
+        if len(queue.transitions) >= MAX_TRANSITIONS:
+            self.stats.transitions_dropped += 1
+            logger.warning("too many pending events, dropping %r", event)
+            return False
+        queue.transitions.append(event)
+        return True
+
+    async def _consume(self, queue: _SourceQueue) -> None:
+        while True:
+            await queue.ready.wait()
+            if queue.transitions:
+                event = queue.transitions.popleft()
+                if isinstance(event.data, Playing):
+                    queue.playing = event.data
+            elif queue.song is not None:
+                event, queue.song = queue.song, None
+            else:
+                queue.ready.clear()
+                queue.drained.set()
+                continue
+            try:
+                await asyncio.wait_for(self._process(event), self.timeout)
+            except TimeoutError:
+                self.stats.timeouts += 1
+                logger.warning("timeout processing %r", event)
+            except Exception:
+                logger.exception("error processing %r", event)
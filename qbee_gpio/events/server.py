@@ -1,29 +1,87 @@
 import asyncio
+import contextlib
 import logging
-from collections.abc import Awaitable, Callable
-from functools import partial
-from typing import TYPE_CHECKING, Self
+import os
+import socket
+from collections.abc import Callable, Hashable
 
-from concurrent_tasks import RobustStream, TaskPool
+from concurrent_tasks import RobustStream
 from pydantic import BaseModel
 
 from qbee_gpio.events.interface import Event
 from qbee_gpio.events.librespot import parse as _parse_librespot
-from qbee_gpio.events.shairport import parse as _parse_shairport
+from qbee_gpio.events.shairport import ShairportParser
+from qbee_gpio.metrics import Counter, Registry
 
 logger = logging.getLogger(__name__)
 
 
-def _parse(data: bytes) -> Event | None:
+# Largest datagram that can be received.
+MAX_DATAGRAM_SIZE = 65536
+# Datagrams read from the Unix socket before giving back control to the loop.
+MAX_BATCH_SIZE = 1024
+# Seconds to wait before binding again after a failure, doubled up to the maximum.
+RETRY_DELAY = 0.1
+MAX_RETRY_DELAY = 10
+
+
+def _parse(
+    data: bytes,
+    addr: Hashable,
+    shairport: ShairportParser,
+    librespot_session: bytes = b"session",
+) -> Event | None:
     if data.startswith(b"librespot:"):
-        return _parse_librespot(data.removeprefix(b"librespot:"))
-    return _parse_shairport(data)
+        return _parse_librespot(data.removeprefix(b"librespot:"), librespot_session)
+    return shairport.parse(data, addr)
 
 
 class UDPServerConfig(BaseModel):
     host: str = "0.0.0.0"
     port: int = 8000
     timeout: float = 5
+    # Also receive events on a Unix datagram socket created at this path.
+    unix_path: str | None = None
+    # Socket receive buffer size in bytes, for bursts of events, system default if not set.
+    receive_buffer: int | None = None
+    # Datagram sent by librespot when a session begins, after the `librespot:` prefix.
+    librespot_session: str = "session"
+
+
+def bind_udp_socket(config: UDPServerConfig) -> socket.socket:
+    """Bind the socket ahead of starting the server.
+
+    Datagrams received in the meantime are buffered by the kernel.
+    """
+    family, type_, proto, _, address = socket.getaddrinfo(
+        config.host, config.port, type=socket.SOCK_DGRAM
+    )[0]
+    return _bind(socket.socket(family, type_, proto), address, config)
+
+
+def bind_unix_socket(config: UDPServerConfig) -> socket.socket:
+    assert config.unix_path
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(config.unix_path)
+    sock = _bind(
+        socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM), config.unix_path, config
+    )
+    # Players might run as other users, the UDP port is open to them anyway.
+    os.chmod(config.unix_path, 0o666)
+    return sock
+
+
+def _bind(
+    sock: socket.socket, address: str | tuple, config: UDPServerConfig
+) -> socket.socket:
+    try:
+        if config.receive_buffer:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, config.receive_buffer)
+        sock.bind(address)
+    except OSError:
+        sock.close()
+        raise
+    return sock
 
 
 class EventsServer(RobustStream, asyncio.DatagramProtocol):
@@ -32,36 +90,162 @@ class EventsServer(RobustStream, asyncio.DatagramProtocol):
     def __init__(
         self,
         config: UDPServerConfig,
-        process: Callable[[Event], Awaitable],
+        process: Callable[[Event], None],
+        metrics: Registry | None = None,
+        sock: socket.socket | None = None,
     ):
         super().__init__(
-            connector=partial(
-                asyncio.get_running_loop().create_datagram_endpoint,
-                local_addr=(config.host, config.port),
-            ),
+            connector=self._create_endpoint,
             name="udp-events",
+            backoff=self._backoff,
             timeout=config.timeout,
         )
-        self._pool = TaskPool(size=1, timeout=config.timeout)
-
+        self._config = config
+        # Already bound socket, used for the first connection only.
+        self._sock = sock
+        self._unix_sock: socket.socket | None = None
+        self._retry_delay = 0.0
+        self._shairport = ShairportParser()
+        self._librespot_session = config.librespot_session.encode()
+        metrics = metrics or Registry()
+        self._udp_counters = self._counters(metrics, "udp")
+        self._unix_counters = self._counters(metrics, "unix")
         self._process = process
 
-    async def __aenter__(self) -> Self:
-        await self._pool.__aenter__()
-        await super().__aenter__()
-        return self
+    async def __aenter__(self):
+        if self._config.unix_path:
+            self._unix_sock = bind_unix_socket(self._config)
+            self._unix_sock.setblocking(False)
+            asyncio.get_running_loop().add_reader(self._unix_sock.fileno(), self._drain)
+        return await super().__aenter__()
 
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
         await super().__aexit__(exc_type, exc_val, exc_tb)
-        await self._pool.__aexit__(exc_type, exc_val, exc_tb)
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+        if self._unix_sock:
+            asyncio.get_running_loop().remove_reader(self._unix_sock.fileno())
+            self._unix_sock.close()
+            self._unix_sock = None
+            assert self._config.unix_path
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self._config.unix_path)
+
+    async def reconfigure(self, config: UDPServerConfig) -> None:
+        """Apply a new config, sockets are only bound again if needed.
+
+        If they cannot be bound, the previous config is applied again and the
+        error is raised.
+        """
+        rebind = (
+            config.host,
+            config.port,
+            config.unix_path,
+            config.receive_buffer,
+        ) != (
+            self._config.host,
+            self._config.port,
+            self._config.unix_path,
+            self._config.receive_buffer,
+        )
+        old = self._config
+        self._apply(config)
+        if not rebind:
+            return
+        await self.__aexit__(None, None, None)
+        try:
+            # Bind here to fail now instead of retrying in the background.
+            self._sock = await asyncio.to_thread(bind_udp_socket, config)
+            await self.__aenter__()
+        except OSError:
+            if self._sock:
+                self._sock.close()
+                self._sock = None
+            self._apply(old)
+            await self.__aenter__()
+            raise
+
+    def _apply(self, config: UDPServerConfig) -> None:
+        self._config = config
+        self._timeout = config.timeout
+        self._librespot_session = config.librespot_session.encode()
+
+    async def _create_endpoint(
+        self, protocol_factory: Callable[[], asyncio.Protocol]
+    ) -> None:
+        # Resolving and binding can block, the port might also be in use.
+        sock = self._sock or await asyncio.to_thread(bind_udp_socket, self._config)
+        self._sock = None
+        await asyncio.get_running_loop().create_datagram_endpoint(
+            protocol_factory, sock=sock
+        )
+
+    async def _backoff(self) -> None:
+        """Give back control to the loop between attempts, waiting longer after failures."""
+        await asyncio.sleep(self._retry_delay)
+        self._retry_delay = min(
+            max(self._retry_delay * 2, RETRY_DELAY), MAX_RETRY_DELAY
+        )
+
+    def connection_made(self, transport) -> None:
+        self._retry_delay = 0
+        super().connection_made(transport)
+
+    @staticmethod
+    def _counters(
+        metrics: Registry, transport: str
+    ) -> tuple[Counter, Counter, Counter]:
+        """Received, parsed and ignored datagrams counters."""
+        labels = {"transport": transport}
+        return (
+            metrics.counter(
+                "events_datagrams_received_total", "Datagrams received.", labels
+            ),
+            metrics.counter(
+                "events_datagrams_parsed_total",
+                "Datagrams parsed into an event.",
+                labels,
+            ),
+            metrics.counter(
+                "events_datagrams_ignored_total",
+                "Datagrams not producing any event.",
+                labels,
+            ),
+        )
 
     def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
-        if event := _parse(data):
-            self._pool.create_task(self._process(event))
+        if event := self._parse(data, addr, self._udp_counters):
+            self._process(event)
+
+    def _drain(self) -> None:
+        """Read pending datagrams from the Unix socket and process them as a batch."""
+        assert self._unix_sock
+        datagrams = []
+        with contextlib.suppress(BlockingIOError, InterruptedError):
+            while len(datagrams) < MAX_BATCH_SIZE:
+                datagrams.append(self._unix_sock.recvfrom(MAX_DATAGRAM_SIZE))
+        events = [
+            event
+            for data, addr in datagrams
+            if (event := self._parse(data, addr, self._unix_counters))
+        ]
+        for event in events:
+            self._process(event)
+
+    def _parse(
+        self,
+        data: bytes,
+        addr: Hashable,
+        counters: tuple[Counter, Counter, Counter],
+    ) -> Event | None:
+        received, parsed, ignored = counters
+        received.inc()
+        if event := _parse(data, addr, self._shairport, self._librespot_session):
+            parsed.inc()
+        else:
+            ignored.inc()
+        return event
 
     def error_received(self, exc: Exception) -> None:
         logger.warning("error received: %r", exc)
-
-    if TYPE_CHECKING:
-
-        def connection_made(self, transport) -> None: ...
@@ -1,34 +1,96 @@
-from typing import NotRequired, TypedDict
-
-from qbee_gpio.events.interface import Event, Playing, Song
-
-
-class _Song(TypedDict):
-    artist: NotRequired[str]
-    album: NotRequired[str]
-    title: NotRequired[str]
-
-
-_SONG: _Song = {}
-
-
-def parse(data: bytes) -> Event | None:
-    """Data is sent by type so we need to process a full batch of messages to have the complete stuff."""
-    global _SONG
-    if data == b"ssncpbeg":
-        return Event("shairport", Playing(True))
-    if data == b"ssncpend":
-        return Event("shairport", Playing(False))
-    if data.startswith(b"ssncmdst"):
-        _SONG = {}
-    elif data.startswith(b"coreasar"):
-        _SONG["artist"] = data.removeprefix(b"coreasar").decode("utf-8")
-    elif data.startswith(b"coreasal"):
-        _SONG["album"] = data.removeprefix(b"coreasal").decode("utf-8")
-    elif data.startswith(b"coreminm"):
-        _SONG["title"] = data.removeprefix(b"coreminm").decode("utf-8")
-    elif data.startswith(b"ssncmden"):
-        s = Song(**_SONG)
-        _SONG = {}
-        return Event("shairport", s)
-    return None
+from collections.abc import Callable, Hashable
+from time import perf_counter
+
+from qbee_gpio.events.interface import Event, Playing, SessionStart, Song
+
+# Handlers, or the song field set from the data.
+type _Handler = Callable[[Hashable, bytes], Event | None] | str
+# When the song started and its fields.
+type _PartialSong = tuple[float, dict[str, str]]
+
+# Event data is immutable, share it.
+_PLAYING = Playing(True)
+_STOPPED = Playing(False)
+_SESSION_START = SessionStart()
+
+
+class ShairportParser:
+    """Data is sent by type so we need to process a full batch of messages to have the complete stuff.
+
+    Messages start with a 4 bytes type and a 4 bytes code, followed by the data.
+    Songs being received are kept per sender, the oldest ones
+    are evicted when too many are pending or once stale.
+    A session start is only reported by senders not playing already.
+    """
+
+    def __init__(self, max_senders: int = 8, stale_after: float = 60):
+        self._max_senders = max_senders
+        self._stale_after = stale_after
+        # When each song started and its fields received so far, oldest first.
+        # A plain dict is cheaper than an OrderedDict.
+        self._songs: dict[Hashable, _PartialSong] = {}
+        self._playing: set[Hashable] = set()
+        # Song fields are set without calling a handler, an extra call per
+        # datagram is measurable.
+        self._handlers: dict[bytes, _Handler] = {
+            b"ssncpbeg": self._start_playing,
+            b"ssncpend": self._stop_playing,
+            b"ssncmdst": self._start_song,
+            b"coreasar": "artist",
+            b"coreasal": "album",
+            b"coreminm": "title",
+            b"ssncmden": self._end_song,
+        }
+
+    def handles(self, header: bytes) -> bool:
+        return header in self._handlers
+
+    def parse(self, data: bytes, sender: Hashable = None) -> Event | None:
+        # Unknown codes are skipped without decoding the data.
+        if (handler := self._handlers.get(data[:8])) is None:
+            return None
+        if isinstance(handler, str):
+            if (song := self._songs.get(sender)) is None:
+                song = self._new_song(sender)
+            song[1][handler] = data[8:].decode()
+            return None
+        return handler(sender, data)
+
+    def _start_playing(self, sender: Hashable, _: bytes) -> Event:
+        playing = self._playing
+        if sender not in playing:
+            if len(playing) >= self._max_senders:
+                playing.pop()
+            playing.add(sender)
+        return Event("shairport", _PLAYING)
+
+    def _stop_playing(self, sender: Hashable, _: bytes) -> Event:
+        self._playing.discard(sender)
+        return Event("shairport", _STOPPED)
+
+    def _start_song(self, sender: Hashable, _: bytes) -> Event | None:
+        self._new_song(sender)
+        if sender in self._playing:
+            # Track change, the devices are already on.
+            return None
+        # Metadata is sent before playback starts.
+        return Event("shairport", _SESSION_START)
+
+    def _end_song(self, sender: Hashable, _: bytes) -> Event:
+        if (song := self._songs.pop(sender, None)) is None:
+            return Event("shairport", Song())
+        started, fields = song
+        event = Event("shairport", Song(**fields))
+        # The event reads the clock already.
+        if event.received - started > self._stale_after:
+            return Event("shairport", Song())
+        return event
+
+    def _new_song(self, sender: Hashable) -> _PartialSong:
+        songs = self._songs
+        if songs.pop(sender, None) is None and len(songs) >= self._max_senders:
+            # Stale songs are evicted when they are the oldest ones.
+            del songs[next(iter(songs))]
+        song = (perf_counter(), {})
+        songs[sender] = song
+        return song
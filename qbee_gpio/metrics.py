@@ -0,0 +1,194 @@
+import asyncio
+import bisect
+import contextlib
+import logging
+import threading
+from collections.abc import Callable, Mapping, Sequence
+from typing import Literal, Self
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+type Kind = Literal["counter", "gauge"]
+
+# Latencies in seconds, from 100µs to 1s.
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+
+
+class Counter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class CounterFamily:
+    """Counters of a single metric, told apart by their labels."""
+
+    def __init__(self):
+        self.counters: dict[str, Counter] = {}
+
+    def labels(self, labels: Mapping[str, str]) -> Counter:
+        key = ",".join(f'{name}="{value}"' for name, value in labels.items())
+        return self.counters.setdefault(key, Counter())
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self._lock = threading.Lock()
+        self.buckets = tuple(buckets)
+        # Last one is for values above all buckets.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class Registry:
+    """Metrics rendered in the Prometheus text format.
+
+    Values already tracked elsewhere are read when rendering through callbacks.
+    """
+
+    def __init__(self):
+        self._metrics: dict[
+            str,
+            tuple[
+                str,
+                Counter | CounterFamily | Histogram | tuple[Kind, Callable[[], float]],
+            ],
+        ] = {}
+
+    def counter(
+        self, name: str, help_: str, labels: Mapping[str, str] | None = None
+    ) -> Counter:
+        if labels:
+            return self._register(name, help_, CounterFamily()).labels(labels)
+        return self._register(name, help_, Counter())
+
+    def histogram(
+        self,
+        name: str,
+        help_: str,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(name, help_, Histogram(buckets))
+
+    def callback(
+        self,
+        name: str,
+        help_: str,
+        read: Callable[[], float],
+        kind: Kind = "gauge",
+    ) -> None:
+        self._metrics[name] = (help_, (kind, read))
+
+    def _register[T: Counter | CounterFamily | Histogram](
+        self, name: str, help_: str, metric: T
+    ) -> T:
+        if existing := self._metrics.get(name):
+            # Components created again, for instance on config reload, keep counting.
+            if isinstance(existing[1], type(metric)):
+                return existing[1]
+        self._metrics[name] = (help_, metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for name, (help_, metric) in self._metrics.items():
+            lines.append(f"# HELP {name} {help_}")
+            match metric:
+                case Counter():
+                    lines.append(f"# TYPE {name} counter")
+                    lines.append(f"{name} {metric.value}")
+                case CounterFamily():
+                    lines.append(f"# TYPE {name} counter")
+                    for labels, counter in metric.counters.items():
+                        lines.append(f"{name}{{{labels}}} {counter.value}")
+                case Histogram():
+                    lines.append(f"# TYPE {name} histogram")
+                    cumulative = 0
+                    for bucket, count in zip(
+                        metric.buckets, metric.counts, strict=False
+                    ):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{le="{bucket}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{le="+Inf"}} {metric.count}')
+                    lines.append(f"{name}_sum {metric.sum}")
+                    lines.append(f"{name}_count {metric.count}")
+                case (kind, read):
+                    lines.append(f"# TYPE {name} {kind}")
+                    lines.append(f"{name} {read()}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsConfig(BaseModel):
+    host: str = "127.0.0.1"
+    port: int = 9100
+    # Seconds to wait for a request before closing the connection.
+    timeout: float = 5
+
+
+class MetricsServer:
+    """Serve metrics over HTTP, for any path."""
+
+    def __init__(self, config: MetricsConfig, registry: Registry):
+        self._config = config
+        self._registry = registry
+        self._server: asyncio.Server | None = None
+
+    async def __aenter__(self) -> Self:
+        self._server = await asyncio.start_server(
+            self._handle, self._config.host, self._config.port
+        )
+        logger.debug("serving metrics on %s:%d", self._config.host, self._config.port)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @property
+    def port(self) -> int:
+        assert self._server
+        return self._server.sockets[0].getsockname()[1]
+
+    async def _handle(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        with (
+            contextlib.closing(writer),
+            contextlib.suppress(
+                asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError,
+                OSError,
+                TimeoutError,
+            ),
+        ):
+            # The request is not parsed, every path serves the metrics.
+            async with asyncio.timeout(self._config.timeout):
+                await reader.readuntil(b"\r\n\r\n")
+            body = self._registry.render().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                b"Content-Length: %d\r\n"
+                b"Connection: close\r\n\r\n" % len(body) + body
+            )
+            await writer.drain()
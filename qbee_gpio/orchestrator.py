@@ -1,11 +1,38 @@
+import asyncio
 import contextlib
 import logging.config
+import socket
 from contextlib import AsyncExitStack
 from dataclasses import dataclass
+from functools import partial
+from time import perf_counter
+from typing import Any
 
+from qbee_gpio.commands import CommandStream
 from qbee_gpio.config import QbeeConfig
-from qbee_gpio.events import Event, EventsServer, Playing, Song, Source
-from qbee_gpio.power import Power
+from qbee_gpio.display import DisplayConfig
+from qbee_gpio.events import (
+    Event,
+    EventQueue,
+    EventsServer,
+    MetadataPipe,
+    PipeConfig,
+    Playing,
+    PlayingDebouncer,
+    SessionStart,
+    Song,
+    Source,
+)
+from qbee_gpio.metrics import MetricsConfig, MetricsServer, Registry
+from qbee_gpio.power import Power, PowerConfig
+from qbee_gpio.state import (
+    LCDState,
+    SessionState,
+    WarmState,
+    leave_pins_driven,
+    load_state,
+    save_state,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -26,54 +53,390 @@ class QbeeOrchestrator(AsyncExitStack):
 
     When activity is detected, everything is turned on and what is playing is displayed.
     When activity stops, a standby timer starts to turn off if no activity is detected in the meantime.
+
+    A session is kept for each source, only the active one drives the devices.
+    Events from other sources update their session, displayed from it when
+    they become active.
+
+    With a state path, devices are left as they are on exit and the state is saved
+    for the next process to take over without turning the amp or display off.
     """
 
-    def __init__(self, config: QbeeConfig):
+    def __init__(self, config: QbeeConfig, udp_socket: socket.socket | None = None):
         super().__init__()
+        self._config = config
+        self.metrics = Registry()
+        self._metrics_server = (
+            MetricsServer(config.metrics, self.metrics) if config.metrics else None
+        )
+        self._events = EventQueue(self._process, timeout=config.udp.timeout)
+        self._debouncer = PlayingDebouncer(self._events.put, config.stop_debounce)
         self._udp_events = EventsServer(
             config.udp,
-            self._process,
+            self._debouncer.put,
+            self.metrics,
+            udp_socket,
+        )
+        self._pipe_events = (
+            MetadataPipe(config.pipe, self._debouncer.put) if config.pipe else None
         )
-        self._power = Power(config.power) if config.power else None
-        self._display = config.display.get_display()
+        # Changing the state path requires a restart.
+        self._state_path = config.state_path
+        self._state = load_state(config.state_path) if config.state_path else None
+        self._power = (
+            Power(
+                config.power,
+                self.metrics,
+                on=self._state.relay_on if self._state else None,
+            )
+            if config.power
+            else None
+        )
+        self._display = config.display.get_display(self.metrics)
+        # Devices are driven independently so the amp never waits for the display.
+        self._power_commands = CommandStream("power", timeout=config.udp.timeout)
+        self._display_commands = CommandStream("display", timeout=config.udp.timeout)
+        # Songs being drawn, not awaited by display commands.
+        self._song_tasks: set[asyncio.Task] = set()
+        # Subsystems that can be replaced when reloading the config.
+        self._metrics_stack = AsyncExitStack()
+        self._power_stack = AsyncExitStack()
+        self._display_stack = AsyncExitStack()
+        self._pipe_stack = AsyncExitStack()
 
-        self._session: Session | None = None
+        self._sessions: dict[Source, Session] = {}
+        self._active: Source | None = None
+        self._priority = config.priority
+        self._preemption = config.preemption
+
+        self._relay_latency = self.metrics.histogram(
+            "event_to_relay_seconds", "From playing received to amp relay on."
+        )
+        self._display_latency = self.metrics.histogram(
+            "event_to_display_seconds", "From event received to display updated."
+        )
+        self.metrics.callback(
+            "events_queue_depth",
+            "Events waiting to be processed.",
+            lambda: self._events.depth,
+        )
+        self.metrics.callback(
+            "events_songs_dropped_total",
+            "Songs replaced by a newer one before being processed.",
+            lambda: self._events.stats.songs_dropped,
+            kind="counter",
+        )
+        self.metrics.callback(
+            "display_songs_dropped_total",
+            "Songs replaced by a newer one before being sent to the display.",
+            lambda: self._display_commands.replaced,
+            kind="counter",
+        )
+        self.metrics.callback(
+            "events_timeouts_total",
+            "Events that took too long to process.",
+            lambda: self._events.stats.timeouts,
+            kind="counter",
+        )
+        self.metrics.callback(
+            "events_stops_absorbed_total",
+            "Short stops ignored.",
+            lambda: self._debouncer.stats.absorbed,
+            kind="counter",
+        )
 
     async def __aenter__(self):
+        # Filled in by the last device commands, before being saved.
+        warm = None
+        if self._state_path:
+            warm = WarmState()
+            self.callback(self._save_state, self._state_path, warm)
+        self.push_async_callback(self._metrics_stack.aclose)
+        if self._metrics_server:
+            await self._metrics_stack.enter_async_context(self._metrics_server)
+        self.push_async_callback(self._power_stack.aclose)
         if self._power:
-            self.enter_context(self._power)
-        if self._display:
-            await self._display.init()
-            await self._display.stop()
-            self.push_async_callback(self._display.stop)
+            self._power_stack.enter_context(self._power)
+        await self.enter_async_context(self._power_commands)
+        self.push_async_callback(self._display_stack.aclose)
+        await self._start_display(self._state.lcd if self._state else None)
+        self.push_async_callback(self._wait_songs)
+        await self.enter_async_context(self._display_commands)
+        if warm:
+            self.callback(self._detach, warm)
+        if self._state:
+            self._restore(self._state)
+            self._state = None
+        await self.enter_async_context(self._events)
+        await self.enter_async_context(self._debouncer)
         await self.enter_async_context(self._udp_events)
+        self.push_async_callback(self._pipe_stack.aclose)
+        if self._pipe_events:
+            await self._pipe_stack.enter_async_context(self._pipe_events)
         return self
 
+    async def _start_display(self, state: LCDState | None = None) -> None:
+        if self._display:
+            if state:
+                await self._display.adopt(state)
+            else:
+                await self._display.init()
+                await self._display.stop()
+            self._display_stack.push_async_callback(self._display.stop)
+
+    def _restore(self, state: WarmState) -> None:
+        """Resume sessions from the previous process, devices are already in sync."""
+        for session in state.sessions:
+            self._sessions[session.source] = Session(
+                session.source,
+                session.song,
+                None if session.playing is None else Playing(session.playing),
+            )
+        self._active = state.active
+        session = self._active_session()
+        playing = session.playing if session else None
+        if self._power:
+            # Restart the standby timer if needed.
+            self._power_commands.send(
+                partial(self._power.process_playing, playing or Playing(False))
+            )
+        if self._display:
+            self._display_commands.send(partial(self._restore_display, session))
+
+    async def _restore_display(self, session: Session | None) -> None:
+        assert self._display
+        if session and session.playing:
+            await self._display.init()
+            if session.song:
+                await self._display.display_now_playing(session.song)
+        else:
+            await self._display.idle()
+
+    def _save_state(self, path: str, state: WarmState) -> None:
+        state.active = self._active
+        state.sessions = [
+            SessionState(
+                source=session.source,
+                song=session.song,
+                playing=None if session.playing is None else bool(session.playing),
+            )
+            for session in self._sessions.values()
+        ]
+        save_state(path, state)
+        leave_pins_driven()
+        logger.debug("saved state to %s", path)
+
+    def _detach(self, state: WarmState) -> None:
+        """Send last commands to leave devices as they are."""
+        if self._power:
+            self._power_commands.send(partial(self._detach_power, state))
+        if self._display:
+            self._display_commands.send(partial(self._detach_display, state))
+
+    async def _detach_power(self, state: WarmState) -> None:
+        assert self._power
+        state.relay_on = self._power.detach()
+
+    async def _detach_display(self, state: WarmState) -> None:
+        assert self._display
+        state.lcd = await self._display.detach()
+
+    async def reload(self, config: QbeeConfig) -> None:
+        """Apply a new config, only updating subsystems that changed.
+
+        Devices are only replaced if their pins change, pending device commands
+        are run before.
+        """
+        old, self._config = self._config, config
+        # Subsystems that could not be updated keep their config to be tried again.
+        kept: dict[str, Any] = {}
+        for name, apply in (
+            ("metrics", self._reload_metrics),
+            ("udp", self._udp_events.reconfigure),
+            ("pipe", self._reload_pipe),
+        ):
+            if (new := getattr(config, name)) != getattr(old, name):
+                try:
+                    await apply(new)
+                except Exception:
+                    logger.exception("could not apply %s config", name)
+                    kept[name] = getattr(old, name)
+        if kept:
+            self._config = config.model_copy(update=kept)
+        self._events.timeout = config.udp.timeout
+        self._power_commands.timeout = config.udp.timeout
+        self._display_commands.timeout = config.udp.timeout
+        self._debouncer.delay = config.stop_debounce
+        self._priority = config.priority
+        self._preemption = config.preemption
+        if config.power != old.power:
+            self._power_commands.send(partial(self._reload_power, config.power))
+        if config.display != old.display:
+            self._display_commands.send(partial(self._reload_display, config.display))
+
+    async def _reload_metrics(self, config: MetricsConfig | None) -> None:
+        await self._metrics_stack.aclose()
+        self._metrics_server = MetricsServer(config, self.metrics) if config else None
+        if self._metrics_server:
+            await self._metrics_stack.enter_async_context(self._metrics_server)
+
+    async def _reload_pipe(self, config: PipeConfig | None) -> None:
+        await self._pipe_stack.aclose()
+        self._pipe_events = (
+            MetadataPipe(config, self._debouncer.put) if config else None
+        )
+        if self._pipe_events:
+            await self._pipe_stack.enter_async_context(self._pipe_events)
+
+    async def _reload_power(self, config: PowerConfig | None) -> None:
+        if self._power and config and self._power.reconfigure(config):
+            return
+        logger.debug("replacing power")
+        await self._power_stack.aclose()
+        self._power = Power(config, self.metrics) if config else None
+        if self._power:
+            self._power_stack.enter_context(self._power)
+            if (session := self._active_session()) and session.playing:
+                await self._power.process_playing(session.playing)
+
+    async def _reload_display(self, config: DisplayConfig) -> None:
+        if (
+            self._display
+            and config.controller
+            and await self._display.reconfigure(config.controller)
+        ):
+            return
+        logger.debug("replacing display")
+        await self._display_stack.aclose()
+        self._display = config.get_display(self.metrics)
+        await self._start_display()
+        if self._display and (session := self._active_session()) and session.playing:
+            await self._display.init()
+            if session.song:
+                await self._display.display_now_playing(session.song)
+
+    def _active_session(self) -> Session | None:
+        return self._sessions.get(self._active) if self._active else None
+
     async def _process(self, event: Event) -> None:
-        if not self._session or self._session.source != event.source:
-            self._session = Session(event.source)
+        session = self._sessions.setdefault(event.source, Session(event.source))
+        changed = started = False
+        match event.data:
+            case Playing():
+                changed = event.data != session.playing
+                started = changed and bool(event.data)
+                session.playing = event.data
+            case Song():
+                changed = event.data != session.song
+                session.song = event.data
+        active = self._elect(event.source, started)
+        if active != self._active:
+            logger.debug("switching to %s", active)
+            self._active = active
+            if active != event.source:
+                # Another source still playing, display it from its session.
+                self._send_playing(self._sessions[active], event.received)
+                return
+            changed = True
+        elif active != event.source:
+            return
         match event.data:
             case Playing():
-                if event.data != self._session.playing:
+                if changed:
                     logger.debug("start playing" if event.data else "stop playing")
-                    self._session.playing = event.data
-                    if self._display:
-                        if event.data:
-                            await self._display.init()
-                            if self._session.song:
-                                await self._display.display_now_playing(
-                                    self._session.song
-                                )
-                        else:
-                            await self._display.stop()
-                    if self._power:
-                        await self._power.process_playing(event.data)
+                    self._send_playing(session, event.received)
+            case SessionStart():
+                self._prepare()
             case Song():
-                if event.data != self._session.song:
+                if not session.playing:
+                    # A new song is a hint playback is about to start.
+                    self._prepare()
+                if changed:
                     logger.debug("now playing: %r", event.data)
-                    self._session.song = event.data
                     if self._display:
-                        # Display might not be initialized yet, song will be displayed
-                        # when start playing event is received.
-                        with contextlib.suppress(RuntimeError):
-                            await self._display.display_now_playing(event.data)
+                        # Only the latest song waiting for the display is drawn.
+                        self._display_commands.send(
+                            partial(self._display_song, event), key="song"
+                        )
+
+    def _elect(self, source: Source, started: bool) -> Source:
+        """Source driving the devices, after an event from `source`."""
+        if self._active is None:
+            return source
+        if not self._sessions[self._active].playing:
+            # Hand over to the best playing source, or to the latest one.
+            playing = [s for s, session in self._sessions.items() if session.playing]
+            return min(playing, key=self._rank) if playing else source
+        if started and source != self._active:
+            match self._preemption:
+                case "always":
+                    return source
+                case "priority" if self._rank(source) < self._rank(self._active):
+                    return source
+        return self._active
+
+    def _rank(self, source: Source) -> int:
+        if source in self._priority:
+            return self._priority.index(source)
+        return len(self._priority)
+
+    def _send_playing(self, session: Session, received: float) -> None:
+        assert session.playing is not None
+        if self._power:
+            self._power_commands.send(
+                partial(self._power_playing, session.playing, received)
+            )
+        if self._display:
+            self._display_commands.send(
+                partial(self._display_playing, session.playing, session.song, received)
+            )
+
+    def _prepare(self) -> None:
+        if self._power:
+            self._power_commands.send(self._prepare_power)
+
+    async def _prepare_power(self) -> None:
+        # Power might have been replaced since sent.
+        if self._power:
+            await self._power.prepare()
+
+    async def _power_playing(self, playing: Playing, received: float) -> None:
+        assert self._power
+        await self._power.process_playing(playing)
+        if playing:
+            self._relay_latency.observe(perf_counter() - received)
+
+    async def _display_playing(
+        self, playing: Playing, song: Song | None, received: float
+    ) -> None:
+        assert self._display
+        if playing:
+            await self._display.init()
+            if song:
+                await self._display.display_now_playing(song)
+        else:
+            await self._display.idle()
+        self._display_latency.observe(perf_counter() - received)
+
+    async def _display_song(self, event: Event) -> None:
+        # The frame is queued when the task starts eagerly, the next commands are
+        # not held while it waits to be drawn, newer songs replace it meanwhile.
+        task = asyncio.eager_task_factory(
+            asyncio.get_running_loop(), self._draw_song(event)
+        )
+        if not task.done():
+            self._song_tasks.add(task)
+            task.add_done_callback(self._song_tasks.discard)
+
+    async def _draw_song(self, event: Event) -> None:
+        assert self._display
+        assert isinstance(event.data, Song)
+        # Display might not be initialized yet, song will be displayed
+        # when start playing event is received.
+        with contextlib.suppress(RuntimeError):
+            await self._display.display_now_playing(event.data)
+            self._display_latency.observe(perf_counter() - event.received)
+
+    async def _wait_songs(self) -> None:
+        if self._song_tasks:
+            await asyncio.gather(*self._song_tasks, return_exceptions=True)
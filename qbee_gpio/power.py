@@ -4,10 +4,11 @@ from contextlib import ExitStack
 from typing import Self
 
 from concurrent_tasks import BackgroundTask
-from gpiozero import OutputDevice
 from pydantic import BaseModel
 
 from qbee_gpio.events import Playing
+from qbee_gpio.metrics import Registry
+from qbee_gpio.state import release_driven
 
 logger = logging.getLogger(__name__)
 
@@ -18,26 +19,84 @@ class PowerConfig(BaseModel):
     pin_standby: int
     # Number of seconds to keep amp on after sound has stopped.
     standby_duration: float = 600
+    # Turn on as soon as playback is about to start, to let the amp settle.
+    # Turn back off if playback has not started after this number of seconds.
+    # Only turned on when playback starts if not set.
+    prepare_timeout: float | None = None
 
 
 class Power(ExitStack):
     """Handle power and standby."""
 
-    def __init__(self, config: PowerConfig):
+    def __init__(
+        self,
+        config: PowerConfig,
+        metrics: Registry | None = None,
+        on: bool | None = None,
+    ):
+        """:param on: relay state left by a previous process, to keep it as is."""
         super().__init__()
-        self._on_switch = OutputDevice(config.pin_on)
-        self._standby_switch = OutputDevice(config.pin_standby)
-        self._standby_task = BackgroundTask(self._standby, config.standby_duration)
+        from gpiozero import OutputDevice
+
+        self._config = config
+        self._adopted = on is not None
+        self._on_switch = OutputDevice(config.pin_on, initial_value=bool(on))
+        self._standby_switch = OutputDevice(
+            config.pin_standby, initial_value=self._adopted and not on
+        )
+        self._standby_task = BackgroundTask(self._standby_after_playing)
+        self._rollback_task = BackgroundTask(self._rollback_prepare)
+        self._switches = (metrics or Registry()).counter(
+            "relay_switches_total", "Amp relay switched on or off."
+        )
 
     def __enter__(self) -> Self:
         self.enter_context(self._on_switch)
         self.enter_context(self._standby_switch)
-        self._standby_switch.value = True
+        if not self._adopted:
+            self._standby_switch.value = True
         self.callback(self._standby_task.cancel)
+        self.callback(self._rollback_task.cancel)
         logger.debug("started power management")
         return self
 
+    def reconfigure(self, config: PowerConfig) -> bool:
+        """Apply new durations without touching the pins.
+
+        Running timers keep their duration.
+        Return whether it could be applied, pins have changed otherwise.
+        """
+        if (config.pin_on, config.pin_standby) != (
+            self._config.pin_on,
+            self._config.pin_standby,
+        ):
+            return False
+        self._config = config
+        return True
+
+    def detach(self) -> bool:
+        """Stop without closing pins, so the relay stays as it is for the next process.
+
+        Return whether the relay is on.
+        """
+        self._standby_task.cancel()
+        self._rollback_task.cancel()
+        on = bool(self._on_switch.value)
+        # Closing them afterwards does not do anything.
+        release_driven(self._on_switch)
+        release_driven(self._standby_switch)
+        return on
+
+    async def prepare(self) -> None:
+        """Turn on before playback starts, it should be confirmed by `process_playing`."""
+        if self._config.prepare_timeout is None or self._on_switch.value:
+            return
+        logger.debug("preparing for playback")
+        await self._switch(True)
+        self._rollback_task.create()
+
     async def process_playing(self, playing: Playing) -> None:
+        self._rollback_task.cancel()
         if playing:
             logger.debug("cancelling standby mode if needed")
             self._standby_task.cancel()
@@ -45,6 +104,12 @@ class Power(ExitStack):
         else:
             self._standby_task.create()
 
+    async def _standby_after_playing(self) -> None:
+        await self._standby(self._config.standby_duration)
+
+    async def _rollback_prepare(self) -> None:
+        await self._standby(self._config.prepare_timeout or 0)
+
     async def _standby(self, duration: float) -> None:
         if duration > 0:
             logger.debug("entering standby mode")
@@ -56,5 +121,6 @@ class Power(ExitStack):
         if self._on_switch.value == value:
             return
         logger.debug("turning %s", "on" if value else "off")
+        self._switches.inc()
         self._on_switch.value = value
         self._standby_switch.value = not value
@@ -0,0 +1,59 @@
+import logging
+import os
+from collections.abc import Awaitable, Callable
+from typing import Self
+
+from concurrent_tasks import PeriodicTask
+
+from qbee_gpio.config import QbeeConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigWatcher:
+    """Load the config again when its file changes."""
+
+    def __init__(
+        self,
+        apply: Callable[[QbeeConfig], Awaitable[None]],
+        interval: float,
+    ):
+        self._apply = apply
+        self._task = PeriodicTask(interval, self._check) if interval > 0 else None
+        self._stat = self._read_stat()
+
+    async def __aenter__(self) -> Self:
+        if self._task:
+            self._task.create()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._task:
+            self._task.cancel()
+
+    @staticmethod
+    def _read_stat() -> tuple[tuple[int, int, int], ...]:
+        # Editors might replace the file instead of writing to it.
+        stats = []
+        for path in QbeeConfig._paths():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            stats.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        return tuple(stats)
+
+    async def _check(self) -> None:
+        if (stat := self._read_stat()) == self._stat:
+            return
+        self._stat = stat
+        try:
+            config = QbeeConfig.load()
+        except Exception:
+            logger.exception("invalid config, keeping the current one")
+            return
+        logger.info("config changed, reloading")
+        try:
+            await self._apply(config)
+        except Exception:
+            logger.exception("error applying config")
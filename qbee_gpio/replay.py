@@ -0,0 +1,157 @@
+"""Record datagrams sent to the events server and replay them.
+
+- `python -m qbee_gpio.replay record events.log` captures datagrams until interrupted.
+- `python -m qbee_gpio.replay send events.log --speed 2` sends them to a running
+  instance twice as fast as recorded, `--speed 0` sends them as fast as possible.
+- `python -m qbee_gpio.replay parse events.log` feeds them to the events server
+  parsing without any socket, to measure throughput.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import socket
+import struct
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import BinaryIO, NamedTuple
+
+from qbee_gpio.events import Event, EventsServer, UDPServerConfig
+
+MAGIC = b"QBEEUDP1"
+# Seconds since recording started, sender index and datagram size.
+HEADER = struct.Struct("<dHH")
+
+
+class Datagram(NamedTuple):
+    time: float
+    # Senders are numbered in order of appearance, the shairport-sync parser
+    # keeps songs per sender.
+    sender: int
+    data: bytes
+
+
+class Recorder(asyncio.DatagramProtocol):
+    def __init__(self, file: BinaryIO):
+        self._file = file
+        self._file.write(MAGIC)
+        self._senders: dict[tuple[str, int], int] = {}
+        self._start = time.perf_counter()
+        self.count = 0
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        sender = self._senders.setdefault(addr, len(self._senders))
+        self._file.write(
+            HEADER.pack(time.perf_counter() - self._start, sender, len(data)) + data
+        )
+        self.count += 1
+
+
+def read(file: BinaryIO) -> Iterator[Datagram]:
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a datagram log")
+    while header := file.read(HEADER.size):
+        timestamp, sender, size = HEADER.unpack(header)
+        yield Datagram(timestamp, sender, file.read(size))
+
+
+async def record(path: Path, config: UDPServerConfig, duration: float | None) -> int:
+    """Record datagrams for a duration, or until cancelled."""
+    with path.open("wb") as file:
+        recorder = Recorder(file)
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: recorder, local_addr=(config.host, config.port)
+        )
+        try:
+            with contextlib.suppress(TimeoutError):
+                async with asyncio.timeout(duration):
+                    await asyncio.Event().wait()
+        finally:
+            transport.close()
+    return recorder.count
+
+
+def send(path: Path, host: str, port: int, speed: float) -> int:
+    """Send datagrams `speed` times faster than recorded, as fast as possible if 0.
+
+    Each sender gets its own socket. Sending as fast as possible can overflow
+    the receiving socket buffer and lose datagrams.
+    """
+    family, type_, proto, _, address = socket.getaddrinfo(
+        host, port, type=socket.SOCK_DGRAM
+    )[0]
+    count = 0
+    with path.open("rb") as file, contextlib.ExitStack() as stack:
+        sockets: dict[int, socket.socket] = {}
+        start = time.perf_counter()
+        for datagram in read(file):
+            if (
+                speed
+                and (delay := start + datagram.time / speed - time.perf_counter()) > 0
+            ):
+                time.sleep(delay)
+            if datagram.sender not in sockets:
+                sockets[datagram.sender] = stack.enter_context(
+                    socket.socket(family, type_, proto)
+                )
+            sockets[datagram.sender].sendto(datagram.data, address)
+            count += 1
+    return count
+
+
+def parse(path: Path) -> tuple[int, list[Event], float]:
+    """Parse datagrams as the events server would.
+
+    Return the number of datagrams, events and seconds spent parsing.
+    """
+    with path.open("rb") as file:
+        datagrams = [(d.data, (str(d.sender), 0)) for d in read(file)]
+    events: list[Event] = []
+    server = EventsServer(UDPServerConfig(), events.append)
+    start = time.perf_counter()
+    for data, addr in datagrams:
+        server.datagram_received(data, addr)
+    return len(datagrams), events, time.perf_counter() - start
+
+
+def main() -> None:
+    defaults = UDPServerConfig()
+    parser = argparse.ArgumentParser(prog="python -m qbee_gpio.replay")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="record datagrams")
+    record_parser.add_argument("log", type=Path)
+    record_parser.add_argument("--host", default=defaults.host)
+    record_parser.add_argument("--port", type=int, default=defaults.port)
+    record_parser.add_argument(
+        "--duration", type=float, help="seconds to record, until interrupted if unset"
+    )
+    send_parser = commands.add_parser("send", help="send datagrams to an instance")
+    send_parser.add_argument("log", type=Path)
+    send_parser.add_argument("--host", default="127.0.0.1")
+    send_parser.add_argument("--port", type=int, default=defaults.port)
+    send_parser.add_argument(
+        "--speed", type=float, default=1, help="0 to send as fast as possible"
+    )
+    parse_parser = commands.add_parser("parse", help="parse datagrams without socket")
+    parse_parser.add_argument("log", type=Path)
+    args = parser.parse_args()
+
+    match args.command:
+        case "record":
+            config = UDPServerConfig(host=args.host, port=args.port)
+            print(f"recording to {args.log}...")
+            with contextlib.suppress(KeyboardInterrupt):
+                asyncio.run(record(args.log, config, args.duration))
+        case "send":
+            count = send(args.log, args.host, args.port, args.speed)
+            print(f"sent {count} datagrams")
+        case "parse":
+            count, events, duration = parse(args.log)
+            print(f"parsed {count} datagrams into {len(events)} events")
+            if duration:
+                print(f"{count / duration:.1f} datagrams/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import logging
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel, ValidationError
+
+from qbee_gpio.events import Song, Source
+
+if TYPE_CHECKING:
+    from gpiozero import GPIODevice
+
+logger = logging.getLogger(__name__)
+
+# Changes on every boot, devices are powered off in between.
+BOOT_ID_PATH = "/proc/sys/kernel/random/boot_id"
+
+
+class LCDState(BaseModel):
+    # Whether the display is turned off.
+    idle: bool
+    # Content of the controller DDRAM, hex encoded.
+    ddram: str
+
+
+class SessionState(BaseModel):
+    source: Source
+    song: Song | None = None
+    playing: bool | None = None
+
+
+class WarmState(BaseModel):
+    """State handed over to the next process to restart without touching devices."""
+
+    # Boot the state was saved during, it only applies to the same boot.
+    boot_id: str | None = None
+    relay_on: bool | None = None
+    lcd: LCDState | None = None
+    active: Source | None = None
+    sessions: list[SessionState] = []
+
+
+def load_state(path: str) -> WarmState | None:
+    """Load the state left by the previous process, it is only used once."""
+    try:
+        data = Path(path).read_text()
+    except FileNotFoundError:
+        return None
+    os.unlink(path)
+    try:
+        state = WarmState.model_validate_json(data)
+    except ValidationError:
+        logger.warning("invalid state, starting from scratch", exc_info=True)
+        return None
+    if state.boot_id is None or state.boot_id != boot_id():
+        logger.info("state saved during a previous boot, starting from scratch")
+        return None
+    return state
+
+
+def save_state(path: str, state: WarmState) -> None:
+    tmp = f"{path}.tmp"
+    Path(tmp).write_text(
+        state.model_copy(update={"boot_id": boot_id()}).model_dump_json()
+    )
+    os.replace(tmp, path)
+
+
+def boot_id() -> str | None:
+    try:
+        return Path(BOOT_ID_PATH).read_text().strip()
+    except OSError:
+        return None
+
+
+def release_driven(device: "GPIODevice") -> None:  # noqa: UP037
+    """Release the pin of a device, leaving it as it is.
+
+    gpiozero resets pins to inputs when devices are closed, which also happens
+    when they are garbage collected. Closing it afterwards does not do anything.
+    """
+    if (pin := device.pin) is not None and (factory := device.pin_factory):
+        factory.release_pins(device, pin.info.name)
+        device._pin = None
+
+
+def leave_pins_driven() -> None:
+    """Prevent gpiozero from resetting pins to inputs when the process exits.
+
+    The pin factory closes every pin it created, even released ones.
+    """
+    from gpiozero import Device
+
+    Device.pin_factory = None
@@ -1,3 +1,14 @@
 import os
 
 os.environ["GPIOZERO_PIN_FACTORY"] = "mock"
+
+import pytest
+from gpiozero import Device
+from gpiozero.pins.mock import MockFactory
+
+
+@pytest.fixture
+def pin_factory() -> MockFactory:
+    Device.ensure_pin_factory()
+    assert isinstance(Device.pin_factory, MockFactory)
+    return Device.pin_factory
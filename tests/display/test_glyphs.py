@@ -0,0 +1,47 @@
+import pytest
+
+from qbee_gpio.display.glyphs import GLYPHS, GlyphCache, GlyphStats, normalize
+
+
+def test_glyphs():
+    for char, glyph in GLYPHS.items():
+        assert len(glyph.fallback) == 1, char
+        assert all(0 <= row < 0x20 for row in glyph.rows), char
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("Björk", "Björk"),
+        # Decomposed accent.
+        ("Björk", "Björk"),
+        ("Ḃjörk", "Björk"),
+        ("坂本龍一", ""),
+    ],
+)
+def test_normalize(text, expected):
+    assert normalize(text) == expected
+
+
+def test_cache():
+    cache = GlyphCache()
+    lines, uploads = cache.encode(["éèêë", "àâäá"])
+    assert lines == [b"\x00\x01\x02\x03", b"\x04\x05\x06\x07"]
+    assert uploads == [(i, GLYPHS[c]) for i, c in enumerate("éèêëàâäá")]
+    # The least recently used glyphs not needed are replaced.
+    lines, uploads = cache.encode(["éèêë", "ñ"])
+    assert lines == [b"\x00\x01\x02\x03", b"\x04"]
+    assert uploads == [(4, GLYPHS["ñ"])]
+    assert cache.stats == GlyphStats(hits=4, uploads=9)
+    # More than 8 glyphs in a frame, fall back to removing accents.
+    lines, uploads = cache.encode(["éèêëàâäá", "ñ"])
+    assert lines == [b"\x00\x01\x02\x03a\x05\x06\x07", b"\x04"]
+    assert uploads == []
+
+
+def test_tall_cache():
+    cache = GlyphCache(tall=True)
+    lines, uploads = cache.encode(["éèêëà"])
+    # Odd codes show the same glyph as the even one before.
+    assert lines == [b"\x00\x02\x04\x06a"]
+    assert uploads == [(i, GLYPHS[c]) for i, c in enumerate("éèêë")]
@@ -0,0 +1,77 @@
+import subprocess
+import sys
+
+import pytest
+
+from qbee_gpio.display import DisplayConfig
+from qbee_gpio.display.i2c_bus import MockI2CBus
+from qbee_gpio.display.i2c_display import I2CLCDDisplay
+from qbee_gpio.display.lcd_config import I2CLCDConfig
+from qbee_gpio.display.lcd_display import DATA_WRITES, command
+from qbee_gpio.metrics import Registry
+
+
+@pytest.fixture
+def lcd(mocker):
+    lcd = I2CLCDDisplay(I2CLCDConfig(width=4, mock=True))
+    mocker.patch.object(lcd, "_delay")
+    return lcd
+
+
+def test_encode(lcd):
+    # Setup, then enable pulsed for each half, with register select and backlight.
+    assert lcd._encode(DATA_WRITES[ord("A")]) == bytes([0x49, 0x4D, 0x49, 0x1D, 0x19])
+
+
+def test_encode_padding():
+    lcd = I2CLCDDisplay(I2CLCDConfig(frequency=400_000, backlight=False, mock=True))
+    # 100µs is more than 4 bytes at 400kHz.
+    assert lcd._encode(command(0x0C)) == bytes([0x00, 0x04, 0x00, 0xC4, 0xC0]) + bytes(
+        [0xC0] * 3
+    )
+    # Data writes are padded for the default wait, 50µs is 3 bytes at 400kHz.
+    assert lcd._encode(DATA_WRITES[ord("A")]) == bytes(
+        [0x41, 0x45, 0x41, 0x15, 0x11, 0x11]
+    )
+
+
+async def test_block_writes(lcd):
+    await lcd.init()
+    assert isinstance(lcd._pins, MockI2CBus)
+    bus = lcd._pins
+    # Split by the waits after the first handshake write and clearing.
+    assert bus.transactions == 2
+    await lcd._display("abcd\nefgh")
+    # A single transaction for the frame.
+    assert bus.transactions == 3
+    transferred = bus.bytes
+    await lcd._display("abce\nefgh")
+    # Only the changed character.
+    assert bus.transactions == 4
+    assert bus.bytes - transferred == 10
+    await lcd.stop()
+    # Backlight turned off.
+    assert bus.state == 0
+    assert lcd._pins is None
+
+
+async def test_metrics(mocker):
+    metrics = Registry()
+    lcd = DisplayConfig(i2c_lcd=I2CLCDConfig(mock=True)).get_display(metrics)
+    assert isinstance(lcd, I2CLCDDisplay)
+    mocker.patch.object(lcd, "_delay")
+    await lcd.init()
+    await lcd.stop()
+    assert "lcd_i2c_transactions_total 4" in metrics.render()
+
+
+def test_no_gpio_import():
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, qbee_gpio.display.i2c_display; "
+            "assert 'gpiozero' not in sys.modules",
+        ],
+        check=True,
+    )
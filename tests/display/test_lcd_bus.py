@@ -0,0 +1,34 @@
+from qbee_gpio.display.lcd_bus import MockBus, get_bus
+
+
+def test_bus(pin_factory):
+    bus = get_bus(1, (4, 5, 6, 7))
+    assert isinstance(bus, MockBus)
+    bus.write(True, (True, False, True, False))
+    bus.write(True, (True, False, True, False))
+    assert bus.transactions == 1
+    assert [pin_factory.pin(pin).state for pin in (1, 4, 5, 6, 7)] == [
+        True,
+        True,
+        False,
+        True,
+        False,
+    ]
+    bus.write(False, (True, False, True, False))
+    assert bus.transactions == 2
+    assert pin_factory.pin(1).state is False
+    bus.close()
+
+
+def test_bus_read(pin_factory):
+    bus = get_bus(1, (4, 5, 6, 7))
+    assert isinstance(bus, MockBus)
+    bus.write(True, (True, False, True, False))
+    bus.set_reading(True)
+    assert pin_factory.pin(1).state is False
+    pin_factory.pin(7).drive_high()
+    assert bus.read() == (True, False, True, True)
+    assert bus.reads == 1
+    bus.set_reading(False)
+    assert pin_factory.pin(4).function == "output"
+    bus.close()
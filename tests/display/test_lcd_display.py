@@ -1,11 +1,37 @@
+import asyncio
+import gc
+import itertools
+from time import monotonic
+
 import pytest
 
+from qbee_gpio.display.glyphs import GLYPHS, GlyphStats
+from qbee_gpio.display.lcd_bus import MockBus
 from qbee_gpio.display.lcd_display import (
+    DATA_WAIT,
+    DATA_WRITES,
+    DDRAM_SIZE,
+    DISPLAY_OFF,
+    DISPLAY_ON,
+    NIBBLES,
+    RETURN_HOME,
+    SHIFT_LEFT,
     GPIOLCDDisplay,
     LCDConfig,
     LCDPinConfig,
     LCDPins,
+    command,
+    diff_runs,
+    scroll_window,
 )
+from qbee_gpio.state import LCDState
+
+
+@pytest.fixture
+def pin_cfg():
+    return LCDPinConfig(
+        register_select=1, enable=2, data_4=4, data_5=5, data_6=6, data_7=7
+    )
 
 
 @pytest.mark.parametrize(
@@ -20,13 +46,11 @@ from qbee_gpio.display.lcd_display import (
             str.ljust,
             ["A quite longer f", "                "],
         ),
-        (4, "éèîå", str.ljust, ["eeia", "    "]),
+        (4, "éèîå", str.ljust, ["éèîå", "    "]),
+        (4, "日本ḃé", str.ljust, ["bé  ", "    "]),
     ],
 )
-async def test_display(width, message, align, expected, mocker):
-    pin_cfg = LCDPinConfig(
-        register_select=1, enable=2, data_4=4, data_5=5, data_6=6, data_7=7
-    )
+async def test_display(pin_cfg, width, message, align, expected, mocker):
     lcd = GPIOLCDDisplay(LCDConfig(width=width, pins=pin_cfg))
     lcd._pins = LCDPins(pin_cfg)
     mock_print_lines = mocker.patch.object(lcd, "_print_lines")
@@ -34,3 +58,324 @@ async def test_display(width, message, align, expected, mocker):
     await lcd._display(message, align=align)
 
     mock_print_lines.assert_called_once_with(expected)
+    lcd._pins.close()
+
+
+async def test_display_without_custom_characters(pin_cfg, mocker):
+    lcd = GPIOLCDDisplay(LCDConfig(width=4, pins=pin_cfg, custom_characters=False))
+    mock_print_lines = mocker.patch.object(lcd, "_print_lines")
+
+    await lcd._display("éèîå", align=str.ljust)
+
+    mock_print_lines.assert_called_once_with(["eeia", "    "])
+
+
+def test_custom_characters(pin_cfg, mocker):
+    lcd = GPIOLCDDisplay(LCDConfig(width=4, pins=pin_cfg))
+    lcd._pins = LCDPins(pin_cfg)
+    mock_run = mocker.patch.object(lcd, "_run")
+
+    lcd._print_lines(["Bjö ", "rk  "])
+    assert mock_run.call_args.args[0][:9] == [
+        command(0x40),
+        *(DATA_WRITES[row] for row in GLYPHS["ö"].rows),
+    ]
+    assert lcd._ddram[:4] == b"Bj\x00 "
+    assert lcd.glyph_stats == GlyphStats(hits=0, uploads=1)
+
+    lcd._print_lines(["Bjö ", "ö   "])
+    assert mock_run.call_args.args[0] == [
+        command(0x80 | 0x40),
+        DATA_WRITES[0],
+        DATA_WRITES[ord(" ")],
+    ]
+    assert lcd.glyph_stats == GlyphStats(hits=1, uploads=1)
+    lcd._pins.close()
+
+
+def test_tall_custom_characters(pin_cfg, mocker):
+    lcd = GPIOLCDDisplay(LCDConfig(width=4, line_height=10, pins=pin_cfg))
+    lcd._pins = LCDPins(pin_cfg)
+    mock_run = mocker.patch.object(lcd, "_run")
+
+    lcd._print_lines(["éè  ", "    "])
+    plan = mock_run.call_args.args[0]
+    assert plan[:12] == [
+        command(0x40),
+        *(DATA_WRITES[row] for row in (*GLYPHS["é"].rows, 0, 0, 0)),
+    ]
+    assert plan[12] == command(0x40 | 0x10)
+    assert lcd._ddram[:4] == b"\x00\x02  "
+    lcd._pins.close()
+
+
+@pytest.mark.parametrize(
+    ("old", "new", "expected"),
+    [
+        (b"abcd", b"abcd", []),
+        (b"abcd", b"abXd", [(2, b"X")]),
+        (b"abcd", b"XbcY", [(0, b"X"), (3, b"Y")]),
+        (b"abcd", b"XYZW", [(0, b"XYZW")]),
+    ],
+)
+def test_diff_runs(old, new, expected):
+    assert list(diff_runs(old, new)) == expected
+
+
+def test_nibbles():
+    assert NIBBLES[0b10100011] == (
+        (False, True, False, True),
+        (True, True, False, False),
+    )
+
+
+def test_print_lines_only_writes_changes(pin_cfg, mocker):
+    lcd = GPIOLCDDisplay(LCDConfig(width=4, pins=pin_cfg))
+    lcd._pins = LCDPins(pin_cfg)
+    mock_run = mocker.patch.object(lcd, "_run")
+
+    lcd._print_lines(["abcd", "efgh"])
+    # One address set and 4 characters per line.
+    assert len(mock_run.call_args.args[0]) == 10
+
+    lcd._print_lines(["abcd", "efgh"])
+    assert mock_run.call_args.args[0] == []
+
+    lcd._print_lines(["abcd", "eXgh"])
+    assert mock_run.call_args.args[0] == [
+        command(0x80 | 0x41),
+        DATA_WRITES[ord("X")],
+    ]
+    lcd._pins.close()
+
+
+def test_run(pin_cfg, mocker, pin_factory):
+    lcd = GPIOLCDDisplay(LCDConfig(width=4, pins=pin_cfg))
+    lcd._pins = LCDPins(pin_cfg)
+    mocker.patch.object(lcd, "_pulse_enable")
+    lcd._run([DATA_WRITES[0b10100011], DATA_WRITES[0b00110011]])
+    assert isinstance(lcd._pins.bus, MockBus)
+    # The last byte has the same half bytes as the previous one.
+    assert lcd._pins.bus.transactions == 2
+    # Last half byte sent is the low one.
+    assert [pin_factory.pin(pin).state for pin in (1, 4, 5, 6, 7)] == [
+        True,
+        True,
+        True,
+        False,
+        False,
+    ]
+    lcd._pins.close()
+
+
+def test_data_wait(pin_cfg, mocker):
+    lcd = GPIOLCDDisplay(LCDConfig(width=4, pins=pin_cfg))
+    lcd._init()
+    pulses = []
+    pulse_enable = lcd._pulse_enable
+    mocker.patch.object(
+        lcd,
+        "_pulse_enable",
+        side_effect=lambda: (pulses.append(monotonic()), pulse_enable()),
+    )
+    lcd._run([DATA_WRITES[ord(c)] for c in "abcd"])
+    # Each character is processed before the next one is sent.
+    gaps = [b - a for a, b in zip(pulses[1::2], pulses[2::2], strict=False)]
+    assert len(gaps) == 3
+    assert min(gaps) >= DATA_WAIT
+    lcd._stop()
+
+
+def test_busy_flag(pin_cfg, mocker):
+    pin_cfg = pin_cfg.model_copy(update={"read_write": 8})
+    lcd = GPIOLCDDisplay(LCDConfig(width=2, pins=pin_cfg))
+    lcd._init()
+    # Writes come before the maximum duration of the previous one.
+    mocker.patch(
+        "qbee_gpio.display.lcd_display.monotonic", return_value=lcd._last_cmd_start
+    )
+    delay = mocker.patch.object(lcd, "_delay")
+    read_status = mocker.patch.object(
+        lcd,
+        "_read_status",
+        side_effect=[(True, 0)] + [(False, 0)] * 4,
+    )
+    lcd._print_lines(["ab", "  "])
+    # Before the address command and each character.
+    assert read_status.call_count == 4
+    # Only enable pulses, no waiting for commands.
+    assert {c.args for c in delay.call_args_list} == {(0.000001,)}
+    lcd._stop()
+
+
+def test_busy_flag_not_read_once_ready(pin_cfg, mocker):
+    pin_cfg = pin_cfg.model_copy(update={"read_write": 8})
+    lcd = GPIOLCDDisplay(LCDConfig(width=2, pins=pin_cfg))
+    lcd._init()
+    # Each write comes a second after the previous one.
+    mocker.patch(
+        "qbee_gpio.display.lcd_display.monotonic",
+        side_effect=itertools.count(lcd._last_cmd_start + 1),
+    )
+    read_status = mocker.patch.object(lcd, "_read_status")
+    lcd._print_lines(["ab", "  "])
+    read_status.assert_not_called()
+    lcd._stop()
+
+
+def test_read_status(pin_cfg, mocker):
+    pin_cfg = pin_cfg.model_copy(update={"read_write": 8})
+    lcd = GPIOLCDDisplay(LCDConfig(pins=pin_cfg))
+    lcd._pins = LCDPins(pin_cfg)
+    mocker.patch.object(
+        lcd._pins.bus,
+        "read",
+        side_effect=[(True, False, False, True), (False, True, False, False)],
+    )
+    assert lcd._read_status() == (True, 0x12)
+    lcd._pins.close()
+
+
+def test_scroll_window():
+    assert scroll_window("short", 8, 3) == "short"
+    assert scroll_window("0123456789", 8, 0) == "01234567"
+    assert scroll_window("0123456789", 8, 5) == "56789   "
+    assert scroll_window("0123456789", 8, 12) == "  012345"
+    assert scroll_window("0123456789", 8, 14) == "01234567"
+
+
+@pytest.fixture
+def marquee_lcd(pin_cfg, mocker):
+    lcd = GPIOLCDDisplay(
+        LCDConfig(
+            width=8,
+            marquee=True,
+            pins=pin_cfg,
+        )
+    )
+    mocker.patch.object(lcd, "_delay")
+    lcd._init()
+    yield lcd
+    lcd._stop()
+
+
+async def test_marquee_display(marquee_lcd, mocker):
+    mock_print_lines = mocker.patch.object(marquee_lcd, "_print_lines")
+    await marquee_lcd._display("A long line\nshort", align=str.ljust)
+    mock_print_lines.assert_called_once_with(["A long line", "short   "])
+    assert marquee_lcd._scroll_task._task
+    await marquee_lcd._display("short", align=str.ljust)
+    assert not marquee_lcd._scroll_task._task
+
+
+def test_hardware_scroll(marquee_lcd, mocker):
+    run = mocker.spy(marquee_lcd, "_run")
+    marquee_lcd._print_lines(["A long line", "short   "])
+    assert marquee_lcd._ddram[:0x28] == b"A long line".ljust(40)
+    assert marquee_lcd._shift == 0
+    marquee_lcd._scroll()
+    run.assert_called_with((SHIFT_LEFT,))
+    assert marquee_lcd._shift == 1
+    # A new frame resets the shift.
+    marquee_lcd._print_lines(["short   ", "short   "])
+    assert run.call_args.args[0][0] == RETURN_HOME
+    assert marquee_lcd._shift is None
+
+
+def test_software_scroll(marquee_lcd, mocker):
+    line = "A line too long to fit in the controller memory"
+    marquee_lcd._print_lines([line, "short   "])
+    assert marquee_lcd._shift is None
+    assert marquee_lcd._ddram[:8] == b"A line t"
+    run = mocker.spy(marquee_lcd, "_run")
+    marquee_lcd._scroll()
+    assert marquee_lcd._ddram[:8] == b" line to"
+    # Only the first line is rewritten.
+    assert run.call_args.args[0][0] == command(0x80)
+    assert len(run.call_args.args[0]) == 9
+
+
+def test_single_line_scroll(pin_cfg, mocker):
+    lcd = GPIOLCDDisplay(
+        LCDConfig(
+            width=8,
+            lines=1,
+            marquee=True,
+            pins=pin_cfg,
+        )
+    )
+    mocker.patch.object(lcd, "_delay")
+    lcd._init()
+    lcd._print_lines(["A long line"])
+    assert lcd._shift is None
+    assert lcd._scrolled_lines == ["A long line"]
+    lcd._scroll()
+    assert lcd._ddram[:8] == b" long li"
+    lcd._stop()
+
+
+async def test_idle(pin_cfg, mocker):
+    lcd = GPIOLCDDisplay(LCDConfig(width=4, pins=pin_cfg, idle_duration=0.01))
+    mocker.patch.object(lcd, "_delay")
+    await lcd.init()
+    run = mocker.spy(lcd, "_run")
+    await lcd._display("ab")
+    await lcd.idle()
+    run.assert_called_with((DISPLAY_OFF,))
+    # Resume with a single command.
+    await lcd.init()
+    run.assert_called_with((DISPLAY_ON,))
+    await lcd.idle()
+    await asyncio.sleep(0.02)
+    assert lcd._pins is None
+
+
+async def test_reconfigure(pin_cfg, mocker):
+    lcd = GPIOLCDDisplay(LCDConfig(width=4, pins=pin_cfg))
+    mocker.patch.object(lcd, "_delay")
+    await lcd.init()
+    init = mocker.spy(lcd, "_init")
+    await lcd._display("abcdef", align=str.ljust)
+    assert lcd._ddram[:4] == b"abcd"
+    # Laid out again without initializing.
+    assert await lcd.reconfigure(LCDConfig(width=6, pins=pin_cfg))
+    assert lcd._ddram[:6] == b"abcdef"
+    init.assert_not_called()
+    assert not await lcd.reconfigure(LCDConfig(width=6, pins=pin_cfg, lines=4))
+    await lcd.stop()
+
+
+async def test_warm_restart(pin_cfg, mocker, pin_factory):
+    lcd = GPIOLCDDisplay(LCDConfig(width=4, pins=pin_cfg))
+    mocker.patch.object(lcd, "_delay")
+    await lcd.init()
+    await lcd._display("ab", align=str.ljust)
+    state = await lcd.detach()
+    assert state
+    assert not state.idle
+    assert lcd._pins is None
+    del lcd
+    gc.collect()
+    # Left driven once released, enable low.
+    assert pin_factory.pin(2).function == "output"
+    assert not pin_factory.pin(2).state
+
+    lcd = GPIOLCDDisplay(LCDConfig(width=4, pins=pin_cfg))
+    mocker.patch.object(lcd, "_delay")
+    run = mocker.spy(lcd, "_run")
+    await lcd.adopt(state)
+    # Nothing sent, only what changed is written afterwards.
+    run.assert_not_called()
+    await lcd._display("ac", align=str.ljust)
+    assert run.call_args.args[0][0] == command(0x81)
+    await lcd.stop()
+
+
+async def test_adopt_invalid_state(pin_cfg, mocker):
+    lcd = GPIOLCDDisplay(LCDConfig(width=4, pins=pin_cfg))
+    mocker.patch.object(lcd, "_delay")
+    init = mocker.spy(lcd, "_init")
+    await lcd.adopt(LCDState(idle=False, ddram="6162"))
+    init.assert_called_once()
+    assert len(lcd._ddram) == DDRAM_SIZE
+    await lcd.stop()
@@ -0,0 +1,34 @@
+import time
+
+import pytest
+
+from qbee_gpio.display.timing import Delay, SpinDelay, get_delay
+
+
+def test_get_delay():
+    assert type(get_delay(0)) is Delay
+    assert type(get_delay(0.001)) is SpinDelay
+
+
+def test_spin_delay(mocker):
+    sleep = mocker.spy(time, "sleep")
+    delay = SpinDelay(0.001)
+    delay(0.00005)
+    sleep.assert_not_called()
+    delay(0.002)
+    sleep.assert_called_once()
+    assert delay.stats.count == 2
+    assert delay.stats.requested == pytest.approx(0.00205)
+    assert delay.stats.measured >= 0.00205
+    assert delay.stats.mean_overshoot >= 0
+
+
+def test_calibrate(mocker):
+    delay = SpinDelay(0.001)
+    delay.calibrate(samples=10)
+    assert delay._overshoot > 0
+    delay._overshoot = 500_000
+    sleep = mocker.spy(time, "sleep")
+    delay(0.002)
+    # Sleep less than requested to spin the remaining time.
+    sleep.assert_called_once_with(pytest.approx(0.0015))
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from qbee_gpio.display.worker import DisplayWorker, Frame, FrameStats, Init, Stop
+
+
+async def test_worker():
+    handled = []
+
+    def handle(command):
+        handled.append((command, threading.current_thread().name))
+        if command == Frame(["error"]):
+            raise RuntimeError("error")
+
+    worker = DisplayWorker(handle, name="test")
+    await worker.run(Init())
+    await worker.run(Frame(["line"]))
+    with pytest.raises(RuntimeError):
+        await worker.run(Frame(["error"]))
+    await worker.run(Stop())
+    assert handled == [
+        (Init(), "test"),
+        (Frame(["line"]), "test"),
+        (Frame(["error"]), "test"),
+        (Stop(), "test"),
+    ]
+    assert worker._thread is None
+
+
+async def test_latest_frame_wins():
+    started = threading.Event()
+    release = threading.Event()
+    handled = []
+
+    def handle(command):
+        handled.append(command)
+        if command == Frame(["1"]):
+            started.set()
+            release.wait()
+
+    worker = DisplayWorker(handle)
+    first = asyncio.create_task(worker.run(Frame(["1"])))
+    await asyncio.to_thread(started.wait)
+    # Queued while the first frame is being written.
+    others = [asyncio.create_task(worker.run(Frame([str(i)]))) for i in range(2, 5)]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(first, *others)
+    await worker.run(Stop())
+    assert handled == [Frame(["1"]), Frame(["4"]), Stop()]
+    assert worker.stats == FrameStats(rendered=2, dropped=2)
+
+
+async def test_max_frame_rate():
+    handled = []
+    worker = DisplayWorker(
+        lambda c: handled.append((c, time.monotonic())), max_frame_rate=20
+    )
+    await worker.run(Frame(["1"]))
+    await worker.run(Frame(["2"]))
+    await worker.run(Stop())
+    assert [c for c, _ in handled] == [Frame(["1"]), Frame(["2"]), Stop()]
+    assert handled[1][1] - handled[0][1] >= 0.05
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from qbee_gpio.events.debounce import PlayingDebouncer
+from qbee_gpio.events.interface import Event, Playing, Song
+
+
+@pytest.fixture
+def forward(mocker):
+    return mocker.Mock()
+
+
+async def test_absorb(forward):
+    async with PlayingDebouncer(forward, 0.01) as debouncer:
+        debouncer.put(Event("librespot", Playing(True)))
+        debouncer.put(Event("librespot", Playing(False)))
+        debouncer.put(Event("librespot", Song(title="a")))
+        debouncer.put(Event("librespot", Playing(True)))
+        await asyncio.sleep(0.02)
+    assert forward.call_args_list == [
+        ((Event("librespot", Playing(True)),),),
+        ((Event("librespot", Song(title="a")),),),
+        ((Event("librespot", Playing(True)),),),
+    ]
+    assert debouncer.stats.absorbed == 1
+
+
+async def test_forward_stop(forward):
+    async with PlayingDebouncer(forward, 0.01) as debouncer:
+        debouncer.put(Event("librespot", Playing(False)))
+        debouncer.put(Event("shairport", Playing(True)))
+        forward.assert_called_once_with(Event("shairport", Playing(True)))
+        await asyncio.sleep(0.02)
+        forward.assert_called_with(Event("librespot", Playing(False)))
+        # Forwarded on exit.
+        debouncer.put(Event("shairport", Playing(False)))
+    forward.assert_called_with(Event("shairport", Playing(False)))
+    assert debouncer.stats.absorbed == 0
+
+
+async def test_disabled(forward):
+    async with PlayingDebouncer(forward, 0) as debouncer:
+        debouncer.put(Event("librespot", Playing(False)))
+    forward.assert_called_once_with(Event("librespot", Playing(False)))
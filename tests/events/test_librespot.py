@@ -1,4 +1,4 @@
-from qbee_gpio.events.interface import Event, Playing, Song
+from qbee_gpio.events.interface import Event, Playing, SessionStart, Song
 from qbee_gpio.events.librespot import parse
 
 
@@ -18,3 +18,6 @@ async def test_parse():
     )
     assert parse(b"playing") == Event("librespot", Playing(True))
     assert parse(b"stopped") == Event("librespot", Playing(False))
+    assert parse(b"session") == Event("librespot", SessionStart())
+    assert parse(b"loading", session=b"loading") == Event("librespot", SessionStart())
+    assert parse(b"session", session=b"loading") is None
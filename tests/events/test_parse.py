@@ -8,19 +8,21 @@ from qbee_gpio.events.server import _parse
 def _parse_librespot(mocker):
     mocker.patch(
         "qbee_gpio.events.server._parse_librespot",
-        new=lambda m: Event("librespot", Playing(bool(m))),
+        new=lambda m, _: Event("librespot", Playing(bool(m))),
     )
 
 
 @pytest.fixture
-def _parse_shairport(mocker):
-    mocker.patch(
-        "qbee_gpio.events.server._parse_shairport",
-        new=lambda m: Event("shairport", Playing(bool(m))),
-    )
+def shairport(mocker):
+    parser = mocker.Mock()
+    parser.parse.side_effect = lambda m, _: Event("shairport", Playing(bool(m)))
+    return parser
 
 
-@pytest.mark.usefixtures("_parse_librespot", "_parse_shairport")
-def test_parse():
-    assert _parse(b"librespot:1") == Event("librespot", Playing(True))
-    assert _parse(b"1") == Event("shairport", Playing(True))
+@pytest.mark.usefixtures("_parse_librespot")
+def test_parse(shairport):
+    assert _parse(b"librespot:1", ("", 0), shairport) == Event(
+        "librespot", Playing(True)
+    )
+    assert _parse(b"1", ("", 0), shairport) == Event("shairport", Playing(True))
+    shairport.parse.assert_called_once_with(b"1", ("", 0))
@@ -0,0 +1,73 @@
+import asyncio
+import base64
+import os
+
+import pytest
+
+from qbee_gpio.events.interface import Event, Playing, SessionStart, Song
+from qbee_gpio.events.pipe import ItemParser, MetadataPipe, PipeConfig, parse_item
+
+
+def _item(type_code: bytes, data: bytes = b"") -> bytes:
+    item = (
+        f"<item><type>{type_code[:4].hex()}</type><code>{type_code[4:].hex()}</code>"
+        f"<length>{len(data)}</length>\n"
+    ).encode()
+    if data:
+        item += b'<data encoding="base64">\n' + base64.b64encode(data) + b"</data>"
+    return item + b"</item>\n"
+
+
+def test_parse_item():
+    assert parse_item(_item(b"coreasar", b"Pink Floyd")) == (
+        b"coreasar",
+        base64.b64encode(b"Pink Floyd"),
+    )
+    assert parse_item(_item(b"ssncpbeg")) == (b"ssncpbeg", b"")
+    assert parse_item(b"<item>garbage") is None
+
+
+def test_item_parser_chunks():
+    parser = ItemParser(max_item_size=1024)
+    data = _item(b"ssncpbeg") + _item(b"coreminm", b"Money")
+    items = [item for i in range(len(data)) for item in parser.feed(data[i : i + 1])]
+    assert items == [(b"ssncpbeg", b""), (b"coreminm", base64.b64encode(b"Money"))]
+
+
+def test_item_parser_skip_large():
+    parser = ItemParser(max_item_size=128)
+    data = _item(b"ssncPICT", bytes(1024)) + _item(b"ssncpend")
+    items = [
+        item for i in range(0, len(data), 64) for item in parser.feed(data[i : i + 64])
+    ]
+    assert items == [(b"ssncpend", b"")]
+
+
+@pytest.fixture
+def fifo(tmp_path):
+    path = tmp_path / "metadata"
+    os.mkfifo(path)
+    return path
+
+
+async def test_metadata_pipe(mocker, fifo):
+    process = mocker.Mock()
+    async with MetadataPipe(PipeConfig(path=str(fifo)), process):
+        # Does not block waiting for the reader.
+        fd = os.open(fifo, os.O_RDWR)
+        os.write(
+            fd,
+            _item(b"ssncmdst")
+            + _item(b"ssncpbeg")
+            + _item(b"coreasar", b"Pink Floyd")
+            + _item(b"coreasgn", b"Progressive Rock")
+            + _item(b"coreminm", b"Money")
+            + _item(b"ssncmden"),
+        )
+        await asyncio.sleep(0.1)
+        os.close(fd)
+    assert process.call_args_list == [
+        mocker.call(Event("shairport", SessionStart())),
+        mocker.call(Event("shairport", Playing(True))),
+        mocker.call(Event("shairport", Song(artist="Pink Floyd", title="Money"))),
+    ]
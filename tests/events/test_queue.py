@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from qbee_gpio.events.interface import Event, Playing, SessionStart, Song
+from qbee_gpio.events.queue import MAX_TRANSITIONS, EventQueue
+
+
+@pytest.fixture
+def processed():
+    return []
+
+
+@pytest.fixture
+def release():
+    return asyncio.Event()
+
+
+@pytest.fixture
+async def queue(processed, release):
+    async def process(event):
+        processed.append(event)
+        await release.wait()
+
+    async with EventQueue(process, timeout=1) as queue:
+        yield queue
+
+
+async def test_overflow_rules(queue, processed, release):
+    queue.put(Event("librespot", Song(title="a")))
+    await asyncio.sleep(0)
+    # Song "a" is being processed, the next ones wait.
+    queue.put(Event("librespot", Song(title="b")))
+    queue.put(Event("librespot", Playing(True)))
+    queue.put(Event("librespot", Playing(True)))
+    queue.put(Event("librespot", Song(title="c")))
+    queue.put(Event("librespot", Playing(False)))
+    assert queue.depth == 3
+    release.set()
+    await asyncio.sleep(0.01)
+    assert processed == [
+        Event("librespot", Song(title="a")),
+        Event("librespot", Playing(True)),
+        Event("librespot", Playing(False)),
+        Event("librespot", Song(title="c")),
+    ]
+    assert queue.depth == 0
+    assert queue.stats.songs_dropped == 1
+    assert queue.stats.playing_collapsed == 1
+    assert queue.stats.max_depth == 3
+
+
+async def test_sources_independent(queue, processed):
+    queue.put(Event("librespot", Song(title="a")))
+    queue.put(Event("shairport", Playing(True)))
+    await asyncio.sleep(0.01)
+    # The shairport event is not waiting for librespot.
+    assert processed == [
+        Event("librespot", Song(title="a")),
+        Event("shairport", Playing(True)),
+    ]
+
+
+async def test_timeout(mocker):
+    async def process(_):
+        await asyncio.sleep(1)
+
+    async with EventQueue(process, timeout=0.01) as queue:
+        queue.put(Event("librespot", Playing(True)))
+        await asyncio.sleep(0.05)
+        assert queue.stats.timeouts == 1
+
+
+async def test_single_consumer(queue, processed, release):
+    release.set()
+    queue.put(Event("librespot", Playing(True)))
+    await asyncio.sleep(0.01)
+    # The source queue is now empty.
+    queue.put(Event("librespot", Playing(False)))
+    await asyncio.sleep(0.01)
+    consumers = [
+        task
+        for task in asyncio.all_tasks()
+        if "EventQueue._consume" in repr(task.get_coro())
+    ]
+    assert len(consumers) == 1
+    assert processed == [
+        Event("librespot", Playing(True)),
+        Event("librespot", Playing(False)),
+    ]
+
+
+async def test_collapse(queue, processed, release):
+    queue.put(Event("librespot", Playing(True)))
+    await asyncio.sleep(0)
+    # Undone before being processed.
+    queue.put(Event("librespot", Playing(False)))
+    queue.put(Event("librespot", SessionStart()))
+    queue.put(Event("librespot", SessionStart()))
+    queue.put(Event("librespot", Playing(True)))
+    assert queue.depth == 1
+    release.set()
+    await asyncio.sleep(0.01)
+    assert processed == [
+        Event("librespot", Playing(True)),
+        Event("librespot", SessionStart()),
+    ]
+    assert queue.stats.playing_collapsed == 2
+
+
+async def test_bounded(queue, release):
+    queue.put(Event("librespot", Playing(True)))
+    await asyncio.sleep(0)
+    for i in range(MAX_TRANSITIONS * 2):
+        queue.put(Event("librespot", Playing(i % 2 == 0)))
+        queue.put(Event("librespot", SessionStart()))
+    assert queue.depth <= MAX_TRANSITIONS
+    release.set()
+
+
+async def test_drain_on_exit(processed):
+    async def process(event):
+        await asyncio.sleep(0.001)
+        processed.append(event)
+
+    async with EventQueue(process, timeout=1) as queue:
+        queue.put(Event("librespot", Playing(True)))
+        queue.put(Event("librespot", Song(title="a")))
+    assert processed == [
+        Event("librespot", Playing(True)),
+        Event("librespot", Song(title="a")),
+    ]
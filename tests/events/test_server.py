@@ -1,12 +1,17 @@
+import asyncio
+import socket
+from unittest.mock import call
+
 import pytest
 
-from qbee_gpio.events.interface import Event, Playing
-from qbee_gpio.events.server import EventsServer, UDPServerConfig
+from qbee_gpio.events.interface import Event, Playing, SessionStart
+from qbee_gpio.events.server import EventsServer, UDPServerConfig, bind_udp_socket
+from qbee_gpio.metrics import Registry
 
 
 @pytest.fixture
 def process(mocker):
-    return mocker.AsyncMock()
+    return mocker.Mock()
 
 
 @pytest.fixture
@@ -32,3 +37,107 @@ async def test_process_none(mocker, events, process):
     async with events:
         events.datagram_received(b"...", ("", 0))
     process.assert_not_called()
+
+
+async def test_metrics(mocker, process):
+    registry = Registry()
+    events = EventsServer(UDPServerConfig(), process, registry)
+    mocker.patch(
+        "qbee_gpio.events.server._parse",
+        side_effect=[Event("librespot", Playing(True)), None],
+    )
+    async with events:
+        events.datagram_received(b"...", ("", 0))
+        events.datagram_received(b"...", ("", 0))
+    metrics = registry.render()
+    assert 'events_datagrams_received_total{transport="udp"} 2\n' in metrics
+    assert 'events_datagrams_parsed_total{transport="udp"} 1\n' in metrics
+    assert 'events_datagrams_ignored_total{transport="udp"} 1\n' in metrics
+
+
+async def test_librespot_session(process):
+    events = EventsServer(UDPServerConfig(librespot_session="loading"), process)
+    events.datagram_received(b"librespot:loading", ("", 0))
+    process.assert_called_once_with(Event("librespot", SessionStart()))
+
+
+async def test_bound_before_start(process):
+    config = UDPServerConfig(host="127.0.0.1", port=0)
+    sock = bind_udp_socket(config)
+    client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client.sendto(b"librespot:playing", sock.getsockname())
+    client.close()
+    async with EventsServer(config, process, sock=sock):
+        for _ in range(100):
+            if process.called:
+                break
+            await asyncio.sleep(0.01)
+    process.assert_called_once_with(Event("librespot", Playing(True)))
+    assert sock.fileno() == -1
+
+
+async def test_unix_socket(mocker, tmp_path, process):
+    drain = mocker.spy(EventsServer, "_drain")
+    path = tmp_path / "qbee.sock"
+    config = UDPServerConfig(host="127.0.0.1", port=0, unix_path=str(path))
+    registry = Registry()
+    async with EventsServer(config, process, registry):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as client:
+            client.sendto(b"librespot:playing", str(path))
+            client.sendto(b"librespot:stopped", str(path))
+            client.sendto(b"...", str(path))
+        await asyncio.sleep(0.01)
+    # All pending datagrams are read at once.
+    assert drain.call_count == 1
+    assert process.call_args_list == [
+        call(Event("librespot", Playing(True))),
+        call(Event("librespot", Playing(False))),
+    ]
+    assert 'events_datagrams_ignored_total{transport="unix"} 1\n' in registry.render()
+    assert not path.exists()
+
+
+async def test_reconfigure(process):
+    config = UDPServerConfig(host="127.0.0.1", port=0)
+    async with EventsServer(config, process) as events:
+        await events._connected.wait()
+        transport = events._transport
+        await events.reconfigure(config.model_copy(update={"timeout": 1}))
+        assert events._transport is transport
+        await events.reconfigure(config.model_copy(update={"host": "localhost"}))
+        await events._connected.wait()
+        assert events._transport is not transport
+
+
+async def test_port_in_use(process):
+    config = UDPServerConfig(host="127.0.0.1", port=0)
+    with bind_udp_socket(config) as busy:
+        port = busy.getsockname()[1]
+        async with EventsServer(config, process) as events:
+            await events._connected.wait()
+            with pytest.raises(OSError, match="in use"):
+                await events.reconfigure(config.model_copy(update={"port": port}))
+            # Still receiving with the previous config.
+            await asyncio.wait_for(events._connected.wait(), 1)
+            assert events._config == config
+
+
+async def test_reconfigure_unix_failure(tmp_path, process):
+    config = UDPServerConfig(host="127.0.0.1", port=0)
+    async with EventsServer(config, process) as events:
+        await events._connected.wait()
+        with pytest.raises(FileNotFoundError):
+            await events.reconfigure(
+                config.model_copy(update={"unix_path": str(tmp_path / "no" / "sock")})
+            )
+        await asyncio.wait_for(events._connected.wait(), 1)
+        assert events._config == config
+        # Events are still received.
+        address = events._transport.get_extra_info("sockname")
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+            client.sendto(b"librespot:playing", address)
+        for _ in range(100):
+            if process.called:
+                break
+            await asyncio.sleep(0.01)
+    process.assert_called_once_with(Event("librespot", Playing(True)))
@@ -1,15 +1,21 @@
-from qbee_gpio.events.interface import Event, Playing, Song
-from qbee_gpio.events.shairport import parse
+from time import perf_counter
+
+from qbee_gpio.events.interface import Event, Playing, SessionStart, Song
+from qbee_gpio.events.shairport import ShairportParser
 
 
 async def test_parse():
-    assert parse(b"other") is None
-    assert parse(b"ssncmdst...") is None
-    assert parse(b"coreasalThe Dark Side Of The Moon (2011 Remastered Version)") is None
-    assert parse(b"coreasarPink Floyd") is None
-    assert parse(b"other") is None
-    assert parse(b"coreminmMoney - 2011 Remastered Version") is None
-    assert parse(b"ssncmden...") == Event(
+    parser = ShairportParser()
+    assert parser.parse(b"other") is None
+    assert parser.parse(b"ssncmdst...") == Event("shairport", SessionStart())
+    assert (
+        parser.parse(b"coreasalThe Dark Side Of The Moon (2011 Remastered Version)")
+        is None
+    )
+    assert parser.parse(b"coreasarPink Floyd") is None
+    assert parser.parse(b"other") is None
+    assert parser.parse(b"coreminmMoney - 2011 Remastered Version") is None
+    assert parser.parse(b"ssncmden...") == Event(
         "shairport",
         Song(
             artist="Pink Floyd",
@@ -17,5 +23,50 @@ async def test_parse():
             title="Money - 2011 Remastered Version",
         ),
     )
-    assert parse(b"ssncpbeg") == Event("shairport", Playing(True))
-    assert parse(b"ssncpend") == Event("shairport", Playing(False))
+    assert parser.parse(b"ssncpbeg") == Event("shairport", Playing(True))
+    assert parser.parse(b"ssncpend") == Event("shairport", Playing(False))
+
+
+def test_track_change_while_playing():
+    parser = ShairportParser()
+    parser.parse(b"ssncpbeg", "a")
+    # Already playing, no session starts.
+    assert parser.parse(b"ssncmdst", "a") is None
+    assert parser.parse(b"ssncmdst", "b") == Event("shairport", SessionStart())
+    parser.parse(b"ssncpend", "a")
+    assert parser.parse(b"ssncmdst", "a") == Event("shairport", SessionStart())
+
+
+def test_unknown_code_not_decoded():
+    assert ShairportParser().parse(b"coreasgn\xff\xfe") is None
+
+
+def test_interleaved_senders():
+    parser = ShairportParser()
+    parser.parse(b"ssncmdst", "a")
+    parser.parse(b"ssncmdst", "b")
+    parser.parse(b"coreasarPink Floyd", "a")
+    parser.parse(b"coreasarRadiohead", "b")
+    parser.parse(b"coreminmAirbag", "b")
+    parser.parse(b"coreminmMoney", "a")
+    assert parser.parse(b"ssncmden", "b") == Event(
+        "shairport", Song(artist="Radiohead", title="Airbag")
+    )
+    assert parser.parse(b"ssncmden", "a") == Event(
+        "shairport", Song(artist="Pink Floyd", title="Money")
+    )
+
+
+def test_evict_senders(mocker):
+    parser = ShairportParser(max_senders=2, stale_after=10)
+    parser.parse(b"coreminmMoney", "a")
+    parser.parse(b"coreminmAirbag", "b")
+    # Oldest is evicted.
+    mocker.patch(
+        "qbee_gpio.events.shairport.perf_counter", return_value=perf_counter() - 11
+    )
+    parser.parse(b"coreminmBreathe", "c")
+    assert parser.parse(b"ssncmden", "a") == Event("shairport", Song())
+    assert parser.parse(b"ssncmden", "b") == Event("shairport", Song(title="Airbag"))
+    # Stale songs are evicted.
+    assert parser.parse(b"ssncmden", "c") == Event("shairport", Song())
@@ -0,0 +1,49 @@
+import asyncio
+
+from qbee_gpio.commands import CommandStream
+
+
+async def test_ordered():
+    done = []
+
+    async def command(i):
+        await asyncio.sleep(0.001 * (3 - i))
+        done.append(i)
+
+    async with CommandStream("test") as stream:
+        for i in range(3):
+            stream.send(lambda i=i: command(i))
+        assert stream.depth == 3
+    # Pending commands are run before exiting.
+    assert done == [0, 1, 2]
+
+
+async def test_error(mocker):
+    command = mocker.AsyncMock()
+    async with CommandStream("test") as stream:
+        stream.send(mocker.AsyncMock(side_effect=ValueError))
+        stream.send(command)
+    command.assert_called_once()
+
+
+async def test_timeout():
+    async with CommandStream("test", timeout=0.01) as stream:
+        stream.send(lambda: asyncio.sleep(1))
+    assert stream.depth == 0
+
+
+async def test_replace():
+    done = []
+
+    async def command(i):
+        await asyncio.sleep(0.001)
+        done.append(i)
+
+    async with CommandStream("test") as stream:
+        stream.send(lambda: command(0), key="song")
+        stream.send(lambda: command(1))
+        stream.send(lambda: command(2), key="song")
+        assert stream.depth == 2
+    # Replaced, after the commands sent in the meantime.
+    assert done == [1, 2]
+    assert stream.replaced == 1
@@ -0,0 +1,69 @@
+import asyncio
+
+from qbee_gpio.metrics import MetricsConfig, MetricsServer, Registry
+
+
+def test_render():
+    registry = Registry()
+    registry.counter("writes_total", "Writes.").inc(3)
+    histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(2)
+    registry.callback("depth", "Depth.", lambda: 2)
+    assert registry.render() == (
+        "# HELP writes_total Writes.\n"
+        "# TYPE writes_total counter\n"
+        "writes_total 3\n"
+        "# HELP latency_seconds Latency.\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{le="0.1"} 1\n'
+        'latency_seconds_bucket{le="1"} 2\n'
+        'latency_seconds_bucket{le="+Inf"} 3\n'
+        "latency_seconds_sum 2.55\n"
+        "latency_seconds_count 3\n"
+        "# HELP depth Depth.\n"
+        "# TYPE depth gauge\n"
+        "depth 2\n"
+    )
+
+
+def test_registered_again():
+    registry = Registry()
+    registry.counter("writes_total", "Writes.").inc()
+    registry.counter("writes_total", "Writes.").inc()
+    assert "writes_total 2\n" in registry.render()
+
+
+def test_labels():
+    registry = Registry()
+    registry.counter("writes_total", "Writes.", {"bus": "gpio"}).inc()
+    registry.counter("writes_total", "Writes.", {"bus": "i2c"}).inc(2)
+    registry.counter("writes_total", "Writes.", {"bus": "gpio"}).inc()
+    assert registry.render() == (
+        "# HELP writes_total Writes.\n"
+        "# TYPE writes_total counter\n"
+        'writes_total{bus="gpio"} 2\n'
+        'writes_total{bus="i2c"} 2\n'
+    )
+
+
+async def test_server():
+    registry = Registry()
+    registry.counter("writes_total", "Writes.").inc()
+    async with MetricsServer(MetricsConfig(port=0), registry) as server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+    assert response.startswith(b"HTTP/1.1 200 OK\r\n")
+    assert response.endswith(b"writes_total 1\n")
+
+
+async def test_server_timeout():
+    async with MetricsServer(MetricsConfig(port=0, timeout=0.01), Registry()) as server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        # The connection is closed without a complete request.
+        writer.write(b"GET /metrics HTTP/1.1\r\n")
+        assert await asyncio.wait_for(reader.read(), 1) == b""
+        writer.close()
@@ -1,12 +1,15 @@
+import asyncio
 from unittest.mock import call
 
 import pytest
 
 from qbee_gpio.config import QbeeConfig
-from qbee_gpio.display import Display
-from qbee_gpio.events import Event, Playing, Song
+from qbee_gpio.display import Display, DisplayConfig
+from qbee_gpio.display.lcd_display import GPIOLCDDisplay, LCDConfig, LCDPinConfig
+from qbee_gpio.events import Event, PipeConfig, Playing, SessionStart, Song
 from qbee_gpio.orchestrator import QbeeOrchestrator, Session
 from qbee_gpio.power import Power, PowerConfig
+from qbee_gpio.state import LCDState
 
 
 @pytest.fixture
@@ -32,16 +35,15 @@ def power(mocker):
 
 
 async def _send_events(orchestrator):
-    assert orchestrator._session is None
+    assert not orchestrator._sessions
     await orchestrator._process(Event("librespot", Playing(True)))
     await orchestrator._process(Event("librespot", Song(title="name")))
     await orchestrator._process(Event("librespot", Playing(True)))
     await orchestrator._process(Event("librespot", Playing(False)))
-    assert orchestrator._session == Session(
-        "librespot",
-        Song(title="name"),
-        Playing(False),
-    )
+    assert orchestrator._active == "librespot"
+    assert orchestrator._sessions == {
+        "librespot": Session("librespot", Song(title="name"), Playing(False))
+    }
 
 
 async def test_with_only_power(get_display, power):
@@ -51,10 +53,10 @@ async def test_with_only_power(get_display, power):
     ) as orchestrator:
         assert orchestrator._display is None
         await _send_events(orchestrator)
-        assert power.process_playing.call_args_list == [
-            call(Playing(True)),
-            call(Playing(False)),
-        ]
+    assert power.process_playing.call_args_list == [
+        call(Playing(True)),
+        call(Playing(False)),
+    ]
 
 
 async def test_with_only_display(get_display, display):
@@ -63,7 +65,8 @@ async def test_with_only_display(get_display, display):
         assert orchestrator._power is None
         await _send_events(orchestrator)
     assert display.init.call_count == 2
-    assert display.stop.call_count == 3
+    assert display.stop.call_count == 2
+    assert display.idle.call_count == 1
     display.display_now_playing.assert_called_once_with(Song(title="name"))
 
 
@@ -78,5 +81,247 @@ async def test_full(get_display, display, power):
         call(Playing(False)),
     ]
     assert display.init.call_count == 2
-    assert display.stop.call_count == 3
+    assert display.stop.call_count == 2
+    assert display.idle.call_count == 1
     display.display_now_playing.assert_called_once_with(Song(title="name"))
+
+
+async def test_power_not_waiting_for_display(get_display, display, power):
+    get_display.return_value = display
+    async with QbeeOrchestrator(
+        QbeeConfig(power=PowerConfig(pin_on=1, pin_standby=2))
+    ) as orchestrator:
+        initialized = asyncio.Event()
+        display.init.side_effect = initialized.wait
+        await orchestrator._process(Event("librespot", Playing(True)))
+        await asyncio.sleep(0.01)
+        power.process_playing.assert_called_once_with(Playing(True))
+        initialized.set()
+
+
+async def test_songs_waiting_for_display(get_display, display):
+    get_display.return_value = display
+    async with QbeeOrchestrator(QbeeConfig()) as orchestrator:
+        initialized = asyncio.Event()
+        display.init.side_effect = initialized.wait
+        await orchestrator._process(Event("librespot", Playing(True)))
+        await asyncio.sleep(0.01)
+        for i in range(3):
+            await orchestrator._process(Event("librespot", Song(title=f"{i}")))
+        initialized.set()
+    # Stale songs are not drawn once the display is ready.
+    display.display_now_playing.assert_called_once_with(Song(title="2"))
+    assert "display_songs_dropped_total 2\n" in orchestrator.metrics.render()
+
+
+async def test_prepare_power(get_display, power):
+    get_display.return_value = None
+    async with QbeeOrchestrator(
+        QbeeConfig(power=PowerConfig(pin_on=1, pin_standby=2))
+    ) as orchestrator:
+        await orchestrator._process(Event("shairport", SessionStart()))
+        await orchestrator._process(Event("librespot", Song(title="name")))
+        await orchestrator._process(Event("librespot", Playing(True)))
+        # Playback has started already.
+        await orchestrator._process(Event("librespot", Song(title="other")))
+    assert power.prepare.call_count == 2
+
+
+async def test_inactive_source(get_display, display, power):
+    get_display.return_value = display
+    async with QbeeOrchestrator(
+        QbeeConfig(power=PowerConfig(pin_on=1, pin_standby=2))
+    ) as orchestrator:
+        await orchestrator._process(Event("librespot", Playing(True)))
+        await orchestrator._process(Event("librespot", Song(title="one")))
+        # Stray events from another source.
+        await orchestrator._process(Event("shairport", SessionStart()))
+        await orchestrator._process(Event("shairport", Song(title="two")))
+        await orchestrator._process(Event("shairport", Playing(False)))
+        await orchestrator._process(Event("librespot", Playing(False)))
+    assert orchestrator._sessions["shairport"] == Session(
+        "shairport", Song(title="two"), Playing(False)
+    )
+    assert power.process_playing.call_args_list == [
+        call(Playing(True)),
+        call(Playing(False)),
+    ]
+    power.prepare.assert_not_called()
+    display.display_now_playing.assert_called_once_with(Song(title="one"))
+
+
+async def test_switch_back_from_cache(get_display, display, power):
+    get_display.return_value = display
+    async with QbeeOrchestrator(
+        QbeeConfig(power=PowerConfig(pin_on=1, pin_standby=2))
+    ) as orchestrator:
+        await orchestrator._process(Event("librespot", Playing(True)))
+        await orchestrator._process(Event("librespot", Song(title="one")))
+        await orchestrator._process(Event("shairport", Song(title="two")))
+        await orchestrator._process(Event("shairport", Playing(True)))
+        assert orchestrator._active == "shairport"
+        await orchestrator._process(Event("shairport", Playing(False)))
+        assert orchestrator._active == "librespot"
+    assert power.process_playing.call_args_list == [
+        call(Playing(True)),
+        call(Playing(True)),
+        call(Playing(True)),
+    ]
+    assert display.display_now_playing.call_args_list == [
+        call(Song(title="one")),
+        call(Song(title="two")),
+        call(Song(title="one")),
+    ]
+    display.idle.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    ("preemption", "first", "second", "active"),
+    [
+        ("always", "shairport", "librespot", "librespot"),
+        ("priority", "shairport", "librespot", "shairport"),
+        ("priority", "librespot", "shairport", "shairport"),
+        ("never", "librespot", "shairport", "librespot"),
+    ],
+)
+async def test_preemption(get_display, display, preemption, first, second, active):
+    get_display.return_value = display
+    async with QbeeOrchestrator(QbeeConfig(preemption=preemption)) as orchestrator:
+        await orchestrator._process(Event(first, Song(title=first)))
+        await orchestrator._process(Event(first, Playing(True)))
+        await orchestrator._process(Event(second, Song(title=second)))
+        await orchestrator._process(Event(second, Playing(True)))
+        assert orchestrator._active == active
+    assert display.display_now_playing.call_args_list[-1] == call(Song(title=active))
+
+
+async def test_reload(mocker, get_display, display, power):
+    get_display.return_value = display
+    config = QbeeConfig(power=PowerConfig(pin_on=1, pin_standby=2))
+    power_class = mocker.patch("qbee_gpio.orchestrator.Power", return_value=power)
+    async with QbeeOrchestrator(config) as orchestrator:
+        await orchestrator._process(Event("librespot", Playing(True)))
+        await orchestrator.reload(
+            config.model_copy(
+                update={
+                    "stop_debounce": 1,
+                    "power": PowerConfig(pin_on=1, pin_standby=2, standby_duration=1),
+                }
+            )
+        )
+        assert orchestrator._debouncer.delay == 1
+        await asyncio.sleep(0.01)
+        power.reconfigure.assert_called_once()
+        assert power_class.call_count == 1
+        get_display.assert_called_once()
+        # Pins changed.
+        power.reconfigure.return_value = False
+        await orchestrator.reload(
+            config.model_copy(update={"power": PowerConfig(pin_on=3, pin_standby=2)})
+        )
+        await asyncio.sleep(0.01)
+        assert power_class.call_count == 2
+        # Restored from the session.
+        assert power.process_playing.call_args_list == [
+            call(Playing(True)),
+            call(Playing(True)),
+        ]
+
+
+async def test_warm_restart(mocker, tmp_path, get_display, display, power):
+    leave_pins_driven = mocker.patch("qbee_gpio.orchestrator.leave_pins_driven")
+    get_display.return_value = display
+    power_class = mocker.patch("qbee_gpio.orchestrator.Power", return_value=power)
+    power.detach.return_value = True
+    lcd = LCDState(idle=False, ddram="6e616d65")
+    display.detach.return_value = lcd
+    config = QbeeConfig(
+        power=PowerConfig(pin_on=1, pin_standby=2),
+        state_path=str(tmp_path / "state.json"),
+    )
+    async with QbeeOrchestrator(config) as orchestrator:
+        await orchestrator._process(Event("librespot", Playing(True)))
+        await orchestrator._process(Event("librespot", Song(title="name")))
+    leave_pins_driven.assert_called_once()
+    power.detach.assert_called_once()
+    display.detach.assert_called_once()
+    assert (tmp_path / "state.json").exists()
+
+    display.reset_mock()
+    power.reset_mock()
+    async with QbeeOrchestrator(config) as orchestrator:
+        assert power_class.call_args.kwargs["on"] is True
+        display.adopt.assert_called_once_with(lcd)
+        display.stop.assert_not_called()
+        await asyncio.sleep(0.01)
+        assert orchestrator._active == "librespot"
+        assert orchestrator._sessions == {
+            "librespot": Session("librespot", Song(title="name"), Playing(True))
+        }
+        power.process_playing.assert_called_once_with(Playing(True))
+        display.display_now_playing.assert_called_once_with(Song(title="name"))
+        # Only used once.
+        assert not (tmp_path / "state.json").exists()
+
+
+async def test_pending_stop_on_exit(get_display, power):
+    get_display.return_value = None
+    async with QbeeOrchestrator(
+        QbeeConfig(power=PowerConfig(pin_on=1, pin_standby=2), stop_debounce=10)
+    ) as orchestrator:
+        orchestrator._debouncer.put(Event("librespot", Playing(True)))
+        orchestrator._debouncer.put(Event("librespot", Playing(False)))
+    # Forwarded by the debouncer on exit and still processed.
+    assert power.process_playing.call_args_list == [
+        call(Playing(True)),
+        call(Playing(False)),
+    ]
+
+
+async def test_reload_timeout_and_failure(mocker, get_display):
+    get_display.return_value = None
+    config = QbeeConfig()
+    async with QbeeOrchestrator(config) as orchestrator:
+        mocker.patch.object(
+            orchestrator, "_reload_pipe", side_effect=OSError("no such pipe")
+        )
+        new = config.model_copy(
+            update={
+                "udp": config.udp.model_copy(update={"timeout": 1}),
+                "pipe": PipeConfig(),
+                "stop_debounce": 1,
+            }
+        )
+        await orchestrator.reload(new)
+        # Applied after the failure.
+        assert orchestrator._debouncer.delay == 1
+        assert orchestrator._events.timeout == 1
+        assert orchestrator._power_commands.timeout == 1
+        # Tried again on the next reload.
+        assert orchestrator._config.pipe is None
+
+
+async def test_rapid_songs(mocker):
+    config = QbeeConfig(
+        display=DisplayConfig(
+            lcd=LCDConfig(
+                pins=LCDPinConfig(
+                    register_select=1, enable=2, data_4=4, data_5=5, data_6=6, data_7=7
+                ),
+                max_frame_rate=5,
+            )
+        )
+    )
+    async with QbeeOrchestrator(config) as orchestrator:
+        lcd = orchestrator._display
+        assert isinstance(lcd, GPIOLCDDisplay)
+        mocker.patch.object(lcd, "_delay")
+        print_lines = mocker.spy(lcd, "_print_lines")
+        await orchestrator._process(Event("librespot", Playing(True)))
+        for i in range(10):
+            await orchestrator._process(Event("librespot", Song(title=f"{i}")))
+            await asyncio.sleep(0.01)
+    # Songs waiting for the frame rate are replaced by newer ones.
+    assert lcd.frame_stats.dropped > 0
+    assert lcd.frame_stats.rendered < 10
+    assert print_lines.call_args.args[0][1].strip() == "9"
@@ -1,4 +1,5 @@
 import asyncio
+import gc
 
 import pytest
 from gpiozero import OutputDevice
@@ -24,8 +25,8 @@ def standby_switch(mocker):
 @pytest.fixture
 def _mock_gpio(mocker, on_switch, standby_switch):
     mocker.patch(
-        "qbee_gpio.power.OutputDevice",
-        new=lambda p: on_switch if p == 1 else standby_switch,
+        "gpiozero.OutputDevice",
+        new=lambda p, **_: on_switch if p == 1 else standby_switch,
     )
 
 
@@ -54,3 +55,64 @@ async def test_lifecycle(power, on_switch, standby_switch):
         await power.process_playing(Playing(False))
         await asyncio.sleep(0.002)
         assert_standby()
+
+
+@pytest.mark.usefixtures("_mock_gpio")
+async def test_prepare(on_switch):
+    power = Power(
+        PowerConfig(
+            pin_on=1, pin_standby=2, standby_duration=0.001, prepare_timeout=0.001
+        )
+    )
+    with power:
+        await power.prepare()
+        assert on_switch.value is True
+        # Confirmed by playback.
+        await power.process_playing(Playing(True))
+        await asyncio.sleep(0.002)
+        assert on_switch.value is True
+        await power.process_playing(Playing(False))
+        await asyncio.sleep(0.002)
+        assert on_switch.value is False
+        # Rolled back when playback does not start.
+        await power.prepare()
+        assert on_switch.value is True
+        await asyncio.sleep(0.002)
+        assert on_switch.value is False
+
+
+async def test_prepare_disabled(power, on_switch):
+    with power:
+        await power.prepare()
+        assert on_switch.value is False
+
+
+@pytest.mark.usefixtures("_mock_gpio")
+async def test_reconfigure(power, on_switch):
+    with power:
+        assert power.reconfigure(
+            PowerConfig(pin_on=1, pin_standby=2, standby_duration=10)
+        )
+        await power.process_playing(Playing(True))
+        await power.process_playing(Playing(False))
+        await asyncio.sleep(0.002)
+        assert on_switch.value is True
+        assert not power.reconfigure(PowerConfig(pin_on=3, pin_standby=2))
+
+
+async def test_warm_restart(pin_factory):
+    config = PowerConfig(pin_on=20, pin_standby=21)
+    with Power(config) as power:
+        await power.process_playing(Playing(True))
+        assert power.detach() is True
+    del power
+    gc.collect()
+    # Left driven once released.
+    on = pin_factory.pin(20)
+    assert on.function == "output"
+    assert on.state
+    on.clear_states()
+    with Power(config, on=True) as power:
+        await power.process_playing(Playing(True))
+        assert all(state for _, state in on.states)
+        assert not pin_factory.pin(21).state
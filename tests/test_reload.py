@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from qbee_gpio.config import QbeeConfig
+from qbee_gpio.reload import ConfigWatcher
+
+
+@pytest.fixture
+def config_path(mocker, tmp_path):
+    path = tmp_path / "conf.yaml"
+    path.write_text("stop_debounce: 1\n")
+    mocker.patch.object(QbeeConfig, "_paths", return_value=(path,))
+    return path
+
+
+async def test_reload(mocker, config_path):
+    apply = mocker.AsyncMock()
+    async with ConfigWatcher(apply, 0.01):
+        await asyncio.sleep(0.02)
+        apply.assert_not_called()
+        config_path.write_text("stop_debounce: 2.5\n")
+        await asyncio.sleep(0.02)
+    apply.assert_called_once_with(QbeeConfig(stop_debounce=2.5))
+
+
+async def test_invalid(mocker, config_path):
+    apply = mocker.AsyncMock()
+    async with ConfigWatcher(apply, 0.01):
+        config_path.write_text("stop_debounce: invalid\n")
+        await asyncio.sleep(0.02)
+    apply.assert_not_called()
@@ -0,0 +1,85 @@
+import asyncio
+import io
+import socket
+
+import pytest
+
+from qbee_gpio.events import Event, Playing, SessionStart, Song, UDPServerConfig
+from qbee_gpio.replay import Recorder, parse, read, record, send
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = tmp_path / "events.log"
+    with path.open("wb") as file:
+        recorder = Recorder(file)
+        recorder.datagram_received(b"librespot:playing", ("127.0.0.1", 1))
+        recorder.datagram_received(b"ssncmdst", ("127.0.0.1", 2))
+        recorder.datagram_received(b"coreminmTitle", ("127.0.0.1", 2))
+        recorder.datagram_received(b"ssncmden", ("127.0.0.1", 2))
+        recorder.datagram_received(b"librespot:stopped", ("127.0.0.1", 1))
+    return path
+
+
+def test_read(log):
+    with log.open("rb") as file:
+        datagrams = list(read(file))
+    assert [(d.sender, d.data) for d in datagrams] == [
+        (0, b"librespot:playing"),
+        (1, b"ssncmdst"),
+        (1, b"coreminmTitle"),
+        (1, b"ssncmden"),
+        (0, b"librespot:stopped"),
+    ]
+    assert [d.time for d in datagrams] == sorted(d.time for d in datagrams)
+
+
+def test_read_invalid():
+    with pytest.raises(ValueError, match="not a datagram log"):
+        list(read(io.BytesIO(b"something else")))
+
+
+def test_parse(log):
+    count, events, _ = parse(log)
+    assert count == 5
+    assert events == [
+        Event("librespot", Playing(True)),
+        Event("shairport", SessionStart()),
+        Event("shairport", Song(title="Title")),
+        Event("librespot", Playing(False)),
+    ]
+
+
+def test_send(log):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as receiver:
+        receiver.bind(("127.0.0.1", 0))
+        receiver.settimeout(1)
+        assert send(log, *receiver.getsockname(), speed=0) == 5
+        received = [receiver.recvfrom(1024) for _ in range(5)]
+    assert [data for data, _ in received] == [
+        b"librespot:playing",
+        b"ssncmdst",
+        b"coreminmTitle",
+        b"ssncmden",
+        b"librespot:stopped",
+    ]
+    # One socket per recorded sender.
+    assert received[0][1] == received[4][1]
+    assert received[1][1] == received[2][1] == received[3][1]
+    assert received[0][1] != received[1][1]
+
+
+async def test_record(tmp_path):
+    path = tmp_path / "events.log"
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    task = asyncio.create_task(
+        record(path, UDPServerConfig(host="127.0.0.1", port=port), 0.2)
+    )
+    await asyncio.sleep(0.05)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+        client.sendto(b"librespot:playing", ("127.0.0.1", port))
+    assert await task == 1
+    with path.open("rb") as file:
+        assert [d.data for d in read(file)] == [b"librespot:playing"]
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+
+# Seconds spent importing what is needed to bind the UDP socket, generous
+# enough for slow CI runners.
+IMPORT_BUDGET = 1.5
+
+# Run the entrypoint until it binds the UDP socket, listing imported modules.
+SCRIPT = """
+import runpy, sys
+from qbee_gpio import config, events
+
+config.QbeeConfig.load = classmethod(lambda cls: cls())
+
+def bind_udp_socket(config):
+    print("\\n".join(sys.modules))
+    sys.exit()
+
+events.bind_udp_socket = bind_udp_socket
+runpy.run_module("qbee_gpio", run_name="__main__")
+"""
+
+
+def _import_time(stderr: str) -> float:
+    """Total time in seconds from `-X importtime` output."""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented, their time is included in the parent's.
+        if not name.removeprefix(" ").startswith(" "):
+            total += int(cumulative)
+    return total / 1e6
+
+
+def _run_until_binding() -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+
+def test_imported_before_binding():
+    _run_until_binding()  # Make sure bytecode is compiled.
+    result = _run_until_binding()
+    modules = set(result.stdout.splitlines())
+    assert "qbee_gpio.config" in modules
+    assert "gpiozero" not in modules
+    assert "qbee_gpio.display.lcd_display" not in modules
+    assert "qbee_gpio.orchestrator" not in modules
+    assert "qbee_gpio.reload" not in modules
+    assert _import_time(result.stderr) < IMPORT_BUDGET
@@ -0,0 +1,23 @@
+from qbee_gpio.state import WarmState, load_state, save_state
+
+
+def test_load_once(tmp_path):
+    path = str(tmp_path / "state.json")
+    save_state(path, WarmState(relay_on=True))
+    state = load_state(path)
+    assert state
+    assert state.relay_on
+    assert load_state(path) is None
+
+
+def test_previous_boot(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text(WarmState(relay_on=True, boot_id="previous").model_dump_json())
+    assert load_state(str(path)) is None
+    assert not path.exists()
+
+
+def test_invalid(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("{")
+    assert load_state(str(path)) is None